@@ -1,18 +1,52 @@
+import numpy as np
 import pandas as pd
+import atexit
+import codecs
+import copy
 import csv
+import functools
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Union
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Iterator, List, Dict, Optional, Union
 import os
+import re
+import sys
+import time
+import weakref
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from openpyxl import load_workbook
+
+try:
+    from charset_normalizer import from_bytes as detect_charset
+except ImportError:
+    detect_charset = None
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+@functools.lru_cache(maxsize=8)
+def _parse_json_file(path: str, mtime_ns: int) -> Dict:
+    """JSONファイルを解析（パスと更新時刻をキーにキャッシュ）"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def load_json_cached(path) -> Dict:
+    """JSONファイルを読み込む。変更がなければ前回の解析結果の複製を返す（呼び出し側で変更してもキャッシュに影響しない）"""
+    path = os.path.abspath(path)
+    return copy.deepcopy(_parse_json_file(path, os.stat(path).st_mtime_ns))
+
 
 def load_trading_settings(config_dir: str = 'config') -> Dict:
     """trading_settings.jsonを読み込む"""
     trading_settings_path = os.path.join(config_dir, 'trading_settings.json')
     try:
-        with open(trading_settings_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return load_json_cached(trading_settings_path)
     except FileNotFoundError:
         logging.warning(f"trading_settings.json not found at {trading_settings_path}")
         return {}
@@ -20,14 +54,83 @@ def load_trading_settings(config_dir: str = 'config') -> Dict:
         logging.error(f"Failed to load trading_settings.json: {e}")
         return {}
 
+# 正規列名 -> 入力データで使われる列名候補（優先順）
+COLUMN_ALIASES = {
+    'currency_pair': ('通貨ペア', 'currency_pair'),
+    'side': ('方向', 'direction', '売買', 'side'),
+    'quantity': ('数量', 'quantity'),
+    'entry_time': ('エントリー時刻', 'entry_time', 'エントリー時間'),
+    'exit_time': ('クローズ時刻', 'exit_time', '決済時間'),
+    'price': ('価格', 'price'),
+    'status': ('ステータス', 'status'),
+    'executed': ('実行済み', 'executed'),
+    'closed': ('決済済み', 'closed'),
+}
+
+@dataclass(slots=True)
+class Trade:
+    """1件のトレード（辞書ではなくスロット属性で保持し、参照を軽くする）"""
+    id: str
+    currency_pair: str
+    side: str
+    quantity: float
+    entry_time: Optional[datetime]
+    exit_time: Optional[datetime]
+    price: object = None
+    status: str = 'pending'
+    executed: bool = False
+    closed: bool = False
+
+# 売買方向の表記ゆれ -> 正規化した方向
+_SIDE_MAP = {
+    '買い': 'buy', 'buy': 'buy', 'long': 'buy', 'l': 'buy', 'ロング': 'buy',
+    '売り': 'sell', 'sell': 'sell', 'short': 'sell', 's': 'sell', 'ショート': 'sell',
+}
+
+# 時刻文字列（H:MM, H:MM:SS, HH:MM:SS）
+_TIME_RE = re.compile(r'^(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?$')
+
+def _is_blank(value) -> bool:
+    """None / NaN / 空白 / 'nan' を空値とみなす"""
+    if value is None:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    text = str(value).strip()
+    return not text or text.lower() == 'nan'
+
+def _normalize_side(side: str) -> str:
+    """売買方向を正規化"""
+    return _SIDE_MAP.get(side.lower().strip(), 'buy')
+
+# 終了時に保留中のマークを保存するリーダー（弱参照なので、不要になったリーダーを終了まで保持しない）
+_OPEN_READERS = weakref.WeakSet()
+
+@atexit.register
+def _close_open_readers():
+    """プロセス終了時に、まだ残っているリーダーの保留中の書き込みを反映"""
+    for reader in list(_OPEN_READERS):
+        try:
+            reader.close()
+        except Exception:
+            pass
+
 class DataReader(ABC):
     """データ読み込みの抽象基底クラス"""
     
+    # 未保存のマークがこの件数に達するか、前回保存からこの秒数が経過したら保存
+    SAVE_EVERY_MARKS = 10
+    SAVE_INTERVAL_SECONDS = 5.0
+    
     @abstractmethod
-    def read_data(self) -> List[Dict]:
+    def read_data(self) -> List[Trade]:
         """データを読み込んで統一形式で返す"""
         pass
     
+    def read_data_iter(self) -> Iterator[Trade]:
+        """トレードを1件ずつ返す（既定ではread_dataの結果を順に返す）"""
+        yield from self.read_data()
+    
     @abstractmethod
     def mark_trade_executed(self, trade_id: str) -> bool:
         """トレード実行済みマークを付ける"""
@@ -38,15 +141,33 @@ class DataReader(ABC):
         """トレード決済済みマークを付ける"""
         pass
     
+    def flush(self) -> bool:
+        """保留中の書き込みを反映する（書き込みを遅延しないリーダーでは何もしない）"""
+        return True
+    
+    def close(self):
+        """保留中の書き込みを反映してリソースを解放"""
+        self.flush()
+    
+    def _default_lot_size(self) -> Optional[float]:
+        """数量が空の行に使うdefault_lot_size（未設定ならNone）"""
+        default_amount = self.config.get('trading_settings', {}).get('default_lot_size')
+        return float(default_amount) if default_amount else None
+    
+    def _save_due(self) -> bool:
+        """未保存のマークを今保存すべきか"""
+        return (self._unsaved_marks >= self.SAVE_EVERY_MARKS
+                or time.monotonic() - self._last_saved >= self.SAVE_INTERVAL_SECONDS)
+    
     def _validate_currency_pair(self, currency_pair) -> str:
         """通貨ペアのバリデーション（必須チェック）"""
-        if not currency_pair or str(currency_pair).strip() == '' or str(currency_pair).strip().lower() == 'nan':
+        if not currency_pair or _is_blank(currency_pair):
             raise ValueError("通貨ペアが設定されていません。安全のため処理を停止します。")
         return str(currency_pair).strip()
     
     def _validate_quantity(self, quantity) -> float:
         """数量のバリデーション（必須チェック）"""
-        if not quantity or str(quantity).strip() == '' or str(quantity).strip().lower() == 'nan':
+        if not quantity or _is_blank(quantity):
             raise ValueError("数量が設定されていません。安全のため処理を停止します。")
         try:
             qty = float(quantity)
@@ -55,169 +176,294 @@ class DataReader(ABC):
             return qty
         except (ValueError, TypeError) as e:
             raise ValueError(f"無効な数量形式: {quantity} - {e}")
-
-class ExcelDataReader(DataReader):
-    """Excel形式のトレードデータリーダー"""
-    
-    def __init__(self, file_path: str, config: Dict = None):
-        self.file_path = file_path
-        self.config = config or {}
-        self.data = []
-        self.df = None
-        self.logger = logging.getLogger(__name__)
     
-    def read_data(self) -> List[Dict]:
-        """Excelファイルからトレードデータを読み込み"""
+    def _parse_time_only(self, time_value, today: date) -> Optional[datetime]:
+        """時間のみ（H:MM:SS）をdatetimeオブジェクトに変換（指定日の日付で）"""
+        if time_value is None or (isinstance(time_value, float) and time_value != time_value):
+            return None
+        
+        if isinstance(time_value, datetime):
+            return time_value
+        
+        if isinstance(time_value, dt_time):
+            return datetime.combine(today, time_value)
+        
+        time_str = str(time_value).strip()
+        if not time_str:
+            return None
+        
         try:
-            if not os.path.exists(self.file_path):
-                self.logger.error(f"Excelファイルが見つかりません: {self.file_path}")
-                return []
-            
-            self.df = pd.read_excel(self.file_path)
-            self.logger.info(f"Excel読み込み完了: {len(self.df)}件")
-            
-            trades = []
-            for index, row in self.df.iterrows():
-                trade = self._convert_row_to_trade(row, index)
-                if trade:
-                    trades.append(trade)
+            # H:MM:SS / HH:MM:SS / H:MM は正規表現で直接整数化
+            match = _TIME_RE.match(time_str)
+            if match:
+                hour, minute, second = match.groups()
+                return datetime(today.year, today.month, today.day, int(hour), int(minute), int(second or 0))
             
-            self.data = trades
-            return trades
+            # 想定外の形式のみISO形式として解析
+            return datetime.combine(today, dt_time.fromisoformat(time_str))
             
-        except Exception as e:
-            self.logger.error(f"Excel読み込みエラー: {e}")
-            return []
+        except ValueError as e:
+            self.logger.warning(f"時間解析エラー: {time_str} - {e}")
+            return None
     
-    def _convert_row_to_trade(self, row: pd.Series, index: int) -> Optional[Dict]:
-        """行データをトレード形式に変換"""
+    def _build_trade(self, row: Dict, index: int, prefix: str, today: date,
+                     default_amount: Optional[float]) -> Optional[Trade]:
+        """正規列名をキーとする行データをトレード形式に変換"""
         try:
-            # 数量処理：CSVに値があればそれを使用、空ならdefault_amountを使用
-            quantity_value = row.get('数量', row.get('quantity'))
-            if pd.isna(quantity_value) or str(quantity_value).strip() == '' or str(quantity_value).strip().lower() == 'nan':
-                # 設定からdefault_amountを取得（LINEFXではdefault_lot_sizeを使用）
-                default_amount = self.config.get('trading_settings', {}).get('default_lot_size')
+            # 数量処理：データに値があればそれを使用、空ならdefault_lot_sizeを使用
+            quantity_value = row.get('quantity')
+            if _is_blank(quantity_value):
                 if default_amount:
-                    quantity = float(default_amount)
+                    quantity = default_amount
                     self.logger.info(f"行{index}: 数量が空のためdefault_lot_size({default_amount})を使用")
                 else:
                     raise ValueError(f"行{index}: 数量が設定されておらず、default_lot_sizeも設定されていません")
             else:
                 quantity = self._validate_quantity(quantity_value)
-                self.logger.info(f"行{index}: Excel指定の数量({quantity})を使用")
-            
-            return {
-                'id': f"excel_{index}",
-                'currency_pair': self._validate_currency_pair(row.get('通貨ペア', row.get('currency_pair'))),
-                'side': self._normalize_side(str(row.get('方向', row.get('direction', row.get('売買', row.get('side', 'Long')))))),
-                'quantity': quantity,
-                'entry_time': self._parse_time_only(row.get('エントリー時刻', row.get('entry_time', row.get('エントリー時間')))),
-                'exit_time': self._parse_time_only(row.get('クローズ時刻', row.get('exit_time', row.get('決済時間')))),
-                'price': row.get('価格', row.get('price')),
-                'status': str(row.get('ステータス', row.get('status', 'pending'))).lower(),
-                'executed': str(row.get('実行済み', row.get('executed', 'no'))).lower() == 'yes',
-                'closed': str(row.get('決済済み', row.get('closed', 'no'))).lower() == 'yes'
-            }
+                self.logger.info(f"行{index}: 指定の数量({quantity})を使用")
+            
+            return Trade(
+                id=sys.intern(f"{prefix}_{index}"),
+                currency_pair=self._validate_currency_pair(row.get('currency_pair')),
+                side=_normalize_side(str(row.get('side', 'Long'))),
+                quantity=quantity,
+                entry_time=self._parse_time_only(row.get('entry_time'), today),
+                exit_time=self._parse_time_only(row.get('exit_time'), today),
+                price=row.get('price'),
+                status=str(row.get('status', 'pending')).lower(),
+                executed=str(row.get('executed', 'no')).lower() == 'yes',
+                closed=str(row.get('closed', 'no')).lower() == 'yes'
+            )
         except Exception as e:
             self.logger.warning(f"行{index}の変換に失敗: {e}")
             return None
     
-    def _normalize_side(self, side: str) -> str:
-        """売買方向を正規化"""
-        side = side.lower().strip()
-        if side in ['買い', 'buy', 'long', 'l', 'ロング']:
-            return 'buy'
-        elif side in ['売り', 'sell', 'short', 's', 'ショート']:
-            return 'sell'
-        return 'buy'
-    
     def _parse_datetime(self, dt) -> Optional[datetime]:
         """日時文字列をdatetimeオブジェクトに変換"""
-        if pd.isna(dt):
+        if dt is None or (isinstance(dt, float) and pd.isna(dt)):
             return None
         
         if isinstance(dt, datetime):
             return dt
         
-        if isinstance(dt, str):
-            try:
-                return datetime.strptime(dt, '%Y-%m-%d %H:%M:%S')
-            except:
-                try:
-                    return datetime.strptime(dt, '%Y/%m/%d %H:%M')
-                except:
-                    self.logger.warning(f"日時形式の解析に失敗: {dt}")
-                    return None
+        text = str(dt).strip()
+        if not text:
+            return None
         
+        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y/%m/%d %H:%M'):
+            try:
+                return datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+        self.logger.warning(f"日時形式の解析に失敗: {dt}")
         return None
     
-    def _parse_time_only(self, time_str) -> Optional[datetime]:
-        """時間のみ（H:MM:SS）をdatetimeオブジェクトに変換（今日の日付で）"""
-        if pd.isna(time_str) or not time_str:
-            return None
+    @staticmethod
+    def _resolve_column_names(columns) -> Dict[str, str]:
+        """列名エイリアスのうち最初に存在する列を正規名へ対応付け"""
+        rename_map = {}
+        for canonical, aliases in COLUMN_ALIASES.items():
+            for alias in aliases:
+                if alias in columns:
+                    rename_map[alias] = canonical
+                    break
+        return rename_map
+    
+    def _vectorized_to_trades(self, df: pd.DataFrame, prefix: str) -> List[Trade]:
+        """DataFrameを列単位の演算でまとめてトレード形式に変換"""
+        column_map = self._resolve_column_names(df.columns)
+        df = df[list(column_map)].rename(columns=column_map)
         
-        if isinstance(time_str, datetime):
-            return time_str
+        def column(name: str, default=None) -> pd.Series:
+            if name in df.columns:
+                return df[name]
+            return pd.Series(default, index=df.index, dtype=object)
         
-        if isinstance(time_str, str):
-            try:
-                # H:MM:SS または HH:MM:SS フォーマット
-                time_str = str(time_str).strip()
-                
-                # 今日の日付を取得
-                today = datetime.now().date()
-                
-                # 時間文字列をパース
-                if ':' in time_str:
-                    time_parts = time_str.split(':')
-                    if len(time_parts) >= 2:
-                        hour = int(time_parts[0])
-                        minute = int(time_parts[1])
-                        second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                        
-                        # 今日の日付 + 指定時間でdatetimeを作成
-                        return datetime.combine(today, datetime.min.time().replace(hour=hour, minute=minute, second=second))
-                
-                self.logger.warning(f"時間形式の解析に失敗: {time_str}")
-                return None
-                
-            except Exception as e:
-                self.logger.warning(f"時間解析エラー: {time_str} - {e}")
-                return None
+        def blank_mask(series: pd.Series) -> pd.Series:
+            return series.isna() | series.astype(str).str.strip().str.lower().isin(('', 'nan'))
         
-        return None
+        # 通貨ペア（必須）
+        currency_pair = column('currency_pair')
+        invalid = blank_mask(currency_pair)
+        
+        # 数量処理：値があればそれを使用、空ならdefault_lot_sizeを使用
+        raw_quantity = column('quantity')
+        quantity_blank = blank_mask(raw_quantity)
+        quantity = pd.to_numeric(raw_quantity.where(~quantity_blank), errors='coerce')
+        default_amount = self._default_lot_size()
+        if default_amount:
+            quantity = quantity.where(~quantity_blank, default_amount)
+        invalid |= quantity.isna() | (quantity <= 0)
+        
+        if invalid.any():
+            self.logger.warning(f"行{list(df.index[invalid])}の変換に失敗: 通貨ペアまたは数量が不正です")
+        if default_amount and (quantity_blank & ~invalid).any():
+            self.logger.info(f"数量が空の{int((quantity_blank & ~invalid).sum())}行にdefault_lot_size({default_amount})を使用")
+        
+        valid = ~invalid
+        today = datetime.now().date()
+        today_ts = pd.Timestamp(today)
+        
+        def time_column(name: str) -> pd.Series:
+            # 固定フォーマットでまとめて解析し、今日の日付に載せ替える
+            raw = column(name)
+            parsed = pd.to_datetime(raw.astype('string').str.strip(), format='%H:%M:%S', errors='coerce')
+            combined = today_ts + (parsed - parsed.dt.normalize())
+            times = combined.astype(object).where(combined.notna(), None)
+            # H:MMなど固定フォーマット外の値のみ個別に解析
+            fallback = parsed.isna() & ~blank_mask(raw)
+            if fallback.any():
+                times[fallback] = [self._parse_time_only(v, today) for v in raw[fallback]]
+            return times
+        
+        trades = pd.DataFrame({
+            'id': pd.Series([sys.intern(f"{prefix}_{index}") for index in df.index], index=df.index, dtype=object),
+            'currency_pair': currency_pair.astype(str).str.strip(),
+            'side': column('side', 'Long').astype(str).str.lower().str.strip().map(_SIDE_MAP).fillna('buy'),
+            'quantity': quantity.astype(float),
+            'entry_time': time_column('entry_time'),
+            'exit_time': time_column('exit_time'),
+            'price': column('price'),
+            'status': column('status', 'pending').astype(str).str.lower(),
+            'executed': column('executed', 'no').astype(str).str.lower().eq('yes'),
+            'closed': column('closed', 'no').astype(str).str.lower().eq('yes'),
+        })
+        return [Trade(**record) for record in trades[valid].to_dict(orient='records')]
+
+class ExcelDataReader(DataReader):
+    """Excel形式のトレードデータリーダー"""
     
-    def mark_trade_executed(self, trade_id: str) -> bool:
-        """トレード実行済みマークを付ける"""
+    def __init__(self, file_path: str, config: Dict = None):
+        self.file_path = file_path
+        self.config = config or {}
+        self.data = []
+        self.logger = logging.getLogger(__name__)
+        
+        # シートを一度走査した時点の列配置と行数（書き込み時に使用）
+        self._column_index = {}
+        self._row_count = None
+        # マーク書き込み用に開いたままにするワークブックと未保存件数
+        self._workbook = None
+        self._header = []
+        self._unsaved_marks = 0
+        self._last_saved = 0.0
+        _OPEN_READERS.add(self)
+    
+    def read_data(self) -> List[Trade]:
+        """Excelファイルからトレードデータを読み込み"""
         try:
-            if self.df is None:
-                return False
+            trades = list(self.read_data_iter())
+            self.data = trades
+            return trades
             
-            index = int(trade_id.replace('excel_', ''))
-            if index < len(self.df):
-                self.df.at[index, '実行済み'] = 'yes'
-                self.df.to_excel(self.file_path.replace('.xlsx', '_updated.xlsx'), index=False)
-                return True
         except Exception as e:
-            self.logger.error(f"実行マーク失敗: {e}")
+            self.logger.error(f"Excel読み込みエラー: {e}")
+            return []
+    
+    def read_data_iter(self) -> Iterator[Trade]:
+        """Excelの行を走査しながらトレードを1件ずつ返す"""
+        if not os.path.exists(self.file_path):
+            self.logger.error(f"Excelファイルが見つかりません: {self.file_path}")
+            return
+        
+        # 再読み込み前に保留中のマークを保存し、古いワークブックを手放す
+        self.close()
+        
+        # read_onlyモードで行を走査しながら直接トレード形式に変換（DataFrameを経由しない）
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, ())
+            
+            # 正規列名 -> 列番号の対応を一度だけ構築
+            self._column_index = {
+                canonical: header.index(alias)
+                for alias, canonical in self._resolve_column_names(header).items()
+            }
+            
+            row_count = 0
+            today = datetime.now().date()
+            default_amount = self._default_lot_size()
+            positions = list(self._column_index.items())
+            for index, row in enumerate(rows):
+                row_count = index + 1
+                if all(value is None for value in row):
+                    continue
+                record = {name: row[i] for name, i in positions if i < len(row) and row[i] is not None}
+                trade = self._build_trade(record, index, 'excel', today, default_amount)
+                if trade:
+                    yield trade
+        finally:
+            workbook.close()
         
-        return False
+        self._row_count = row_count
+        self.logger.info(f"Excel読み込み完了: {row_count}件")
+    
+    def mark_trade_executed(self, trade_id: str) -> bool:
+        """トレード実行済みマークを付ける"""
+        return self._update_excel_status(trade_id, 'executed', 'yes', '実行')
     
     def mark_trade_closed(self, trade_id: str) -> bool:
         """トレード決済済みマークを付ける"""
+        return self._update_excel_status(trade_id, 'closed', 'yes', '決済')
+    
+    def _update_excel_status(self, trade_id: str, field: str, value: str, label: str) -> bool:
+        """開いたままのワークブックの該当セルだけを書き換え、保存はまとめて行う"""
         try:
-            if self.df is None:
+            if self._row_count is None:
                 return False
             
             index = int(trade_id.replace('excel_', ''))
-            if index < len(self.df):
-                self.df.at[index, '決済済み'] = 'yes'
-                self.df.to_excel(self.file_path.replace('.xlsx', '_updated.xlsx'), index=False)
-                return True
+            if index >= self._row_count:
+                return False
+            
+            if self._workbook is None:
+                self._workbook = load_workbook(self.file_path)
+                self._header = [cell.value for cell in self._workbook.active[1]]
+            
+            sheet = self._workbook.active
+            column = self._find_or_add_column(sheet, self._header, field)
+            sheet.cell(row=index + 2, column=column).value = value
+            self._unsaved_marks += 1
+            
+            if self._save_due():
+                return self.flush()
+            return True
+            
         except Exception as e:
-            self.logger.error(f"決済マーク失敗: {e}")
+            self.logger.error(f"{label}マーク失敗: {e}")
+            return False
+    
+    def flush(self) -> bool:
+        """未保存のマークをExcelファイルに保存"""
+        if self._workbook is None or not self._unsaved_marks:
+            return True
         
-        return False
+        try:
+            self._workbook.save(self.file_path.replace('.xlsx', '_updated.xlsx'))
+            self._unsaved_marks = 0
+            self._last_saved = time.monotonic()
+            return True
+        except Exception as e:
+            self.logger.error(f"Excel保存失敗: {e}")
+            return False
+    
+    def close(self):
+        """未保存のマークを保存してワークブックを閉じる"""
+        self.flush()
+        if self._workbook is not None:
+            self._workbook.close()
+            self._workbook = None
+    
+    @staticmethod
+    def _find_or_add_column(sheet, header: List, field: str) -> int:
+        """正規列名に対応する列番号（1始まり）を返す。無ければヘッダーに追加"""
+        for alias in COLUMN_ALIASES[field]:
+            if alias in header:
+                return header.index(alias) + 1
+        header.append(COLUMN_ALIASES[field][0])
+        sheet.cell(row=1, column=len(header)).value = header[-1]
+        return len(header)
 
 class CSVDataReader(DataReader):
     """CSV形式のトレードデータリーダー"""
@@ -228,8 +474,16 @@ class CSVDataReader(DataReader):
         self.config = config or {}
         self.data = []
         self.logger = logging.getLogger(__name__)
-    
-    def read_data(self) -> List[Dict]:
+        
+        # 読み込み時の生データ（書き戻し用）と未保存件数
+        self._fieldnames = []
+        self._rows = []
+        self._read_encoding = encoding
+        self._unsaved_marks = 0
+        self._last_saved = 0.0
+        _OPEN_READERS.add(self)
+    
+    def read_data(self) -> List[Trade]:
         """CSVファイルからトレードデータを読み込み"""
         try:
             if not os.path.exists(self.file_path):
@@ -238,47 +492,28 @@ class CSVDataReader(DataReader):
             
             trades = []
             
-            # エンコーディングを自動判定して読み込み
-            encodings_to_try = [self.encoding, 'utf-8-sig', 'cp932', 'shift_jis', 'utf-8']
-            
-            for encoding in encodings_to_try:
+            # 先頭64KBだけでエンコーディングを判定し、判定できたものだけを読む
+            for encoding in self._detect_encodings():
                 try:
-                    with open(self.file_path, 'r', encoding=encoding) as csvfile:
-                        # ファイルの最初の数行をチェック
-                        content = csvfile.read()
-                        csvfile.seek(0)
-                        
-                        # BOM付きUTF-8かチェック
-                        if content.startswith('\ufeff'):
-                            content = content[1:]  # BOMを除去
-                            # 一時的にBOMなしでファイルを読み込み
-                            import io
-                            csvfile = io.StringIO(content)
-                        
-                        reader = csv.DictReader(csvfile)
-                        
-                        # 最初の行をテスト読み込み
-                        first_row = next(reader, None)
-                        if first_row and '通貨ペア' in str(first_row.keys()):
-                            # 正常に読み込めた場合
-                            csvfile.seek(0)
-                            if content.startswith('\ufeff'):
-                                csvfile = io.StringIO(content)
-                            reader = csv.DictReader(csvfile)
-                            
-                            for index, row in enumerate(reader):
-                                trade = self._convert_row_to_trade(row, index)
-                                if trade:
-                                    trades.append(trade)
-                            
-                            self.logger.info(f"CSV読み込み成功 (エンコーディング: {encoding})")
-                            break
-                            
+                    df = pd.read_csv(self.file_path, encoding=encoding, dtype=str, keep_default_na=False)
                 except (UnicodeDecodeError, UnicodeError):
                     continue
                 except Exception as e:
                     self.logger.warning(f"エンコーディング {encoding} での読み込み失敗: {e}")
                     continue
+                
+                if 'currency_pair' not in self._resolve_column_names(df.columns).values():
+                    continue
+                
+                # 書き戻し用に生の文字列をそのまま保持
+                self.flush()
+                self._fieldnames = list(df.columns)
+                self._rows = df.values.tolist()
+                self._read_encoding = encoding
+                
+                trades = self._vectorized_to_trades(df, 'csv')
+                self.logger.info(f"CSV読み込み成功 (エンコーディング: {encoding})")
+                break
             
             if not trades:
                 self.logger.error("全てのエンコーディングでCSV読み込みに失敗しました")
@@ -291,134 +526,87 @@ class CSVDataReader(DataReader):
             self.logger.error(f"CSV読み込みエラー: {e}")
             return []
     
-    def _convert_row_to_trade(self, row: Dict, index: int) -> Optional[Dict]:
-        """行データをトレード形式に変換"""
-        try:
-            # 数量処理：CSVに値があればそれを使用、空ならdefault_lot_sizeを使用
-            quantity_value = row.get('数量', row.get('quantity'))
-            if quantity_value is None or str(quantity_value).strip() == '' or str(quantity_value).strip().lower() == 'nan':
-                # 設定からdefault_lot_sizeを取得
-                default_amount = self.config.get('trading_settings', {}).get('default_lot_size')
-                if default_amount:
-                    quantity = float(default_amount)
-                    self.logger.info(f"行{index}: 数量が空のためdefault_lot_size({default_amount})を使用")
-                else:
-                    raise ValueError(f"行{index}: 数量が設定されておらず、default_lot_sizeも設定されていません")
-            else:
-                quantity = self._validate_quantity(quantity_value)
-                self.logger.info(f"行{index}: CSV指定の数量({quantity})を使用")
-            
-            return {
-                'id': f"csv_{index}",
-                'currency_pair': self._validate_currency_pair(row.get('通貨ペア', row.get('currency_pair'))),
-                'side': self._normalize_side(str(row.get('方向', row.get('direction', row.get('売買', row.get('side', 'Long')))))),
-                'quantity': quantity,
-                'entry_time': self._parse_time_only(row.get('エントリー時刻', row.get('entry_time', row.get('エントリー時間')))),
-                'exit_time': self._parse_time_only(row.get('クローズ時刻', row.get('exit_time', row.get('決済時間')))),
-                'price': row.get('価格', row.get('price')),
-                'status': str(row.get('ステータス', row.get('status', 'pending'))).lower(),
-                'executed': str(row.get('実行済み', row.get('executed', 'no'))).lower() == 'yes',
-                'closed': str(row.get('決済済み', row.get('closed', 'no'))).lower() == 'yes'
-            }
-        except Exception as e:
-            self.logger.warning(f"行{index}の変換に失敗: {e}")
-            return None
-    
-    def _normalize_side(self, side: str) -> str:
-        """売買方向を正規化"""
-        side = side.lower().strip()
-        if side in ['買い', 'buy', 'long', 'l', 'ロング']:
-            return 'buy'
-        elif side in ['売り', 'sell', 'short', 's', 'ショート']:
-            return 'sell'
-        return 'buy'
-    
-    def _parse_datetime(self, dt_str: str) -> Optional[datetime]:
-        """日時文字列をdatetimeオブジェクトに変換"""
-        if not dt_str or dt_str.strip() == '':
-            return None
+    def _detect_encodings(self) -> List[str]:
+        """ファイル先頭のバイト列からエンコーディング候補を推定順に返す"""
+        with open(self.file_path, 'rb') as f:
+            head = f.read(65536)
         
-        try:
-            return datetime.strptime(dt_str.strip(), '%Y-%m-%d %H:%M:%S')
-        except:
-            try:
-                return datetime.strptime(dt_str.strip(), '%Y/%m/%d %H:%M')
-            except:
-                self.logger.warning(f"日時形式の解析に失敗: {dt_str}")
-                return None
-    
-    def _parse_time_only(self, time_str) -> Optional[datetime]:
-        """時間のみ（H:MM:SS）をdatetimeオブジェクトに変換（今日の日付で）"""
-        if not time_str or str(time_str).strip() == '':
-            return None
+        # BOM付きUTF-8は確定
+        if head.startswith(codecs.BOM_UTF8):
+            return ['utf-8-sig']
         
-        if isinstance(time_str, datetime):
-            return time_str
+        candidates = []
+        for encoding in dict.fromkeys([self.encoding, 'utf-8-sig', 'cp932', 'shift_jis', 'utf-8']):
+            try:
+                # 末尾で途切れたマルチバイト文字は許容する
+                codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+                candidates.append(encoding)
+            except (UnicodeDecodeError, LookupError):
+                continue
         
-        try:
-            # H:MM:SS または HH:MM:SS フォーマット
-            time_str = str(time_str).strip()
-            
-            # 今日の日付を取得
-            today = datetime.now().date()
-            
-            # 時間文字列をパース
-            if ':' in time_str:
-                time_parts = time_str.split(':')
-                if len(time_parts) >= 2:
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                    
-                    # 今日の日付 + 指定時間でdatetimeを作成
-                    return datetime.combine(today, datetime.min.time().replace(hour=hour, minute=minute, second=second))
-            
-            self.logger.warning(f"時間形式の解析に失敗: {time_str}")
-            return None
-            
-        except Exception as e:
-            self.logger.warning(f"時間解析エラー: {time_str} - {e}")
-            return None
+        # 文字コード推定が使えれば、その結果を最初に試す（外れた場合は残りの候補を順に試す）
+        if detect_charset is not None and candidates:
+            best = detect_charset(head).best()
+            if best is not None:
+                sniffed = codecs.lookup(best.encoding).name
+                candidates.sort(key=lambda encoding: codecs.lookup(encoding).name != sniffed)
+        return candidates
     
     def mark_trade_executed(self, trade_id: str) -> bool:
         """トレード実行済みマークを付ける"""
-        return self._update_csv_status(trade_id, '実行済み', 'yes')
+        return self._update_csv_status(trade_id, 'executed', 'yes')
     
     def mark_trade_closed(self, trade_id: str) -> bool:
         """トレード決済済みマークを付ける"""
-        return self._update_csv_status(trade_id, '決済済み', 'yes')
+        return self._update_csv_status(trade_id, 'closed', 'yes')
     
-    def _update_csv_status(self, trade_id: str, column: str, value: str) -> bool:
-        """CSVファイルのステータスを更新"""
+    def _update_csv_status(self, trade_id: str, field: str, value: str) -> bool:
+        """保持している行データのステータスを更新し、書き戻しはまとめて行う"""
         try:
             index = int(trade_id.replace('csv_', ''))
+            if index >= len(self._rows):
+                return False
             
-            # CSVを読み込み
-            rows = []
-            with open(self.file_path, 'r', encoding=self.encoding) as csvfile:
-                reader = csv.DictReader(csvfile)
-                fieldnames = reader.fieldnames
-                
-                for i, row in enumerate(reader):
-                    if i == index:
-                        row[column] = value
-                    rows.append(row)
+            self._rows[index][self._find_or_add_column(field)] = value
+            self._unsaved_marks += 1
             
-            # CSVに書き戻し
+            if self._save_due():
+                return self.flush()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"CSV更新エラー: {e}")
+            return False
+    
+    def _find_or_add_column(self, field: str) -> int:
+        """正規列名に対応する列番号を返す。無ければ列を追加"""
+        for alias in COLUMN_ALIASES[field]:
+            if alias in self._fieldnames:
+                return self._fieldnames.index(alias)
+        self._fieldnames.append(COLUMN_ALIASES[field][0])
+        for row in self._rows:
+            row.append('')
+        return len(self._fieldnames) - 1
+    
+    def flush(self) -> bool:
+        """未保存のマークをCSVファイルに一度で書き戻す"""
+        if not self._unsaved_marks:
+            return True
+        
+        try:
             backup_file = self.file_path.replace('.csv', '_backup.csv')
             if os.path.exists(backup_file):
                 os.remove(backup_file)
             os.rename(self.file_path, backup_file)
             
-            # エンコーディングを決定（BOM付きの場合は維持）
-            write_encoding = 'utf-8-sig' if self.encoding == 'utf-8-sig' else self.encoding
-            
-            with open(self.file_path, 'w', newline='', encoding=write_encoding) as csvfile:
-                if fieldnames:
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(rows)
+            # 読み込めたエンコーディングで書き戻す（BOM付きの場合は維持）
+            with open(self.file_path, 'w', newline='', encoding=self._read_encoding) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(self._fieldnames)
+                writer.writerows(self._rows)
             
+            self._unsaved_marks = 0
+            self._last_saved = time.monotonic()
             return True
             
         except Exception as e:
@@ -427,6 +615,7 @@ class CSVDataReader(DataReader):
 
 try:
     import gspread
+    from gspread.urls import DRIVE_FILES_API_V3_URL
     from google.oauth2.service_account import Credentials
     GOOGLE_SHEETS_AVAILABLE = True
 except ImportError:
@@ -447,7 +636,15 @@ class GoogleSheetsDataReader(DataReader):
         self.worksheet = None
         self.logger = logging.getLogger(__name__)
         
+        # ヘッダー（列名 -> 列番号）と未送信のセル更新
+        self._column_numbers = {}
+        self._cache_key = None
+        self._pending_updates = []
+        self._unsaved_marks = 0
+        self._last_saved = 0.0
+        
         self._initialize_client()
+        _OPEN_READERS.add(self)
     
     def _initialize_client(self):
         """Google Sheets APIクライアントを初期化"""
@@ -468,28 +665,45 @@ class GoogleSheetsDataReader(DataReader):
             self.client = gspread.authorize(credentials)
             self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
             self.worksheet = self.spreadsheet.worksheet(self.sheet_name)
+            self._column_numbers = {name: i + 1 for i, name in enumerate(self.worksheet.row_values(1))}
             
             self.logger.info("Google Sheets接続完了")
             
         except Exception as e:
             self.logger.error(f"Google Sheets初期化エラー: {e}")
     
-    def read_data(self) -> List[Dict]:
+    def read_data(self) -> List[Trade]:
         """Googleスプレッドシートからトレードデータを読み込み"""
         try:
             if not self.worksheet:
                 self.logger.error("Google Sheetsワークシートが初期化されていません")
                 return []
             
-            records = self.worksheet.get_all_records()
-            trades = []
+            # シートが前回読み込みから更新されていなければ（同じ日付なら）再ダウンロードしない
+            today = datetime.now().date()
+            modified_time = self._fetch_modified_time()
+            if modified_time and (modified_time, today) == self._cache_key:
+                self.logger.info(f"Google Sheets未更新のためキャッシュを使用: {len(self.data)}件")
+                return self.data
+            
+            # get_all_recordsはヘッダーを別途取得するため、全値を1回で取得して辞書化
+            values = self.worksheet.get_all_values()
+            header = values[0] if values else []
+            self._column_numbers = {name: i + 1 for i, name in enumerate(header)}
+            
+            # 列名エイリアスの解決は一度だけ行い、各行は正規列名の辞書にする
+            positions = [(canonical, header.index(alias)) for alias, canonical in self._resolve_column_names(header).items()]
+            records = [{canonical: row[i] for canonical, i in positions if i < len(row)} for row in values[1:]]
             
+            trades = []
+            default_amount = self._default_lot_size()
             for index, row in enumerate(records):
-                trade = self._convert_row_to_trade(row, index)
+                trade = self._build_trade(row, index, 'gsheets', today, default_amount)
                 if trade:
                     trades.append(trade)
             
             self.data = trades
+            self._cache_key = (modified_time, today)
             self.logger.info(f"Google Sheets読み込み完了: {len(trades)}件")
             return trades
             
@@ -497,105 +711,29 @@ class GoogleSheetsDataReader(DataReader):
             self.logger.error(f"Google Sheets読み込みエラー: {e}")
             return []
     
-    def _convert_row_to_trade(self, row: Dict, index: int) -> Optional[Dict]:
-        """行データをトレード形式に変換"""
-        try:
-            # 数量処理：スプレッドシートに値があればそれを使用、空ならdefault_lot_sizeを使用
-            quantity_value = row.get('数量', row.get('quantity'))
-            if quantity_value is None or str(quantity_value).strip() == '' or str(quantity_value).strip().lower() == 'nan':
-                # 設定からdefault_lot_sizeを取得
-                default_amount = self.config.get('trading_settings', {}).get('default_lot_size')
-                if default_amount:
-                    quantity = float(default_amount)
-                    self.logger.info(f"行{index}: 数量が空のためdefault_lot_size({default_amount})を使用")
-                else:
-                    raise ValueError(f"行{index}: 数量が設定されておらず、default_lot_sizeも設定されていません")
-            else:
-                quantity = self._validate_quantity(quantity_value)
-                self.logger.info(f"行{index}: Google Sheets指定の数量({quantity})を使用")
-            
-            return {
-                'id': f"gsheets_{index}",
-                'currency_pair': self._validate_currency_pair(row.get('通貨ペア', row.get('currency_pair'))),
-                'side': self._normalize_side(str(row.get('方向', row.get('direction', row.get('売買', row.get('side', 'Long')))))),
-                'quantity': quantity,
-                'entry_time': self._parse_time_only(row.get('エントリー時刻', row.get('entry_time', row.get('エントリー時間')))),
-                'exit_time': self._parse_time_only(row.get('クローズ時刻', row.get('exit_time', row.get('決済時間')))),
-                'price': row.get('価格', row.get('price')),
-                'status': str(row.get('ステータス', row.get('status', 'pending'))).lower(),
-                'executed': str(row.get('実行済み', row.get('executed', 'no'))).lower() == 'yes',
-                'closed': str(row.get('決済済み', row.get('closed', 'no'))).lower() == 'yes'
-            }
-        except Exception as e:
-            self.logger.warning(f"行{index}の変換に失敗: {e}")
-            return None
-    
-    def _normalize_side(self, side: str) -> str:
-        """売買方向を正規化"""
-        side = side.lower().strip()
-        if side in ['買い', 'buy', 'long', 'l', 'ロング']:
-            return 'buy'
-        elif side in ['売り', 'sell', 'short', 's', 'ショート']:
-            return 'sell'
-        return 'buy'
-    
-    def _parse_datetime(self, dt_str: str) -> Optional[datetime]:
-        """日時文字列をdatetimeオブジェクトに変換"""
-        if not dt_str or str(dt_str).strip() == '':
-            return None
-        
-        try:
-            return datetime.strptime(str(dt_str).strip(), '%Y-%m-%d %H:%M:%S')
-        except:
-            try:
-                return datetime.strptime(str(dt_str).strip(), '%Y/%m/%d %H:%M')
-            except:
-                self.logger.warning(f"日時形式の解析に失敗: {dt_str}")
-                return None
-    
-    def _parse_time_only(self, time_str) -> Optional[datetime]:
-        """時間のみ（H:MM:SS）をdatetimeオブジェクトに変換（今日の日付で）"""
-        if not time_str or str(time_str).strip() == '':
-            return None
-        
-        if isinstance(time_str, datetime):
-            return time_str
-        
+    def _fetch_modified_time(self) -> Optional[str]:
+        """Drive APIからスプレッドシートの最終更新日時のみを取得"""
         try:
-            # H:MM:SS または HH:MM:SS フォーマット
-            time_str = str(time_str).strip()
-            
-            # 今日の日付を取得
-            today = datetime.now().date()
-            
-            # 時間文字列をパース
-            if ':' in time_str:
-                time_parts = time_str.split(':')
-                if len(time_parts) >= 2:
-                    hour = int(time_parts[0])
-                    minute = int(time_parts[1])
-                    second = int(time_parts[2]) if len(time_parts) > 2 else 0
-                    
-                    # 今日の日付 + 指定時間でdatetimeを作成
-                    return datetime.combine(today, datetime.min.time().replace(hour=hour, minute=minute, second=second))
-            
-            self.logger.warning(f"時間形式の解析に失敗: {time_str}")
-            return None
-            
+            response = self.client.request(
+                'get',
+                f"{DRIVE_FILES_API_V3_URL}/{self.spreadsheet_id}",
+                params={'fields': 'modifiedTime', 'supportsAllDrives': True}
+            )
+            return response.json().get('modifiedTime')
         except Exception as e:
-            self.logger.warning(f"時間解析エラー: {time_str} - {e}")
+            self.logger.warning(f"Google Sheets更新日時の取得に失敗: {e}")
             return None
     
     def mark_trade_executed(self, trade_id: str) -> bool:
         """トレード実行済みマークを付ける"""
-        return self._update_cell_value(trade_id, '実行済み', 'yes')
+        return self._update_cell_value(trade_id, 'executed', 'yes')
     
     def mark_trade_closed(self, trade_id: str) -> bool:
         """トレード決済済みマークを付ける"""
-        return self._update_cell_value(trade_id, '決済済み', 'yes')
+        return self._update_cell_value(trade_id, 'closed', 'yes')
     
-    def _update_cell_value(self, trade_id: str, column: str, value: str) -> bool:
-        """スプレッドシートのセル値を更新"""
+    def _update_cell_value(self, trade_id: str, field: str, value: str) -> bool:
+        """セル更新をキューに積み、まとめて1回のAPI呼び出しで送信"""
         try:
             if not self.worksheet:
                 return False
@@ -603,28 +741,44 @@ class GoogleSheetsDataReader(DataReader):
             index = int(trade_id.replace('gsheets_', ''))
             row_number = index + 2  # ヘッダー行を考慮
             
-            # 列名から列番号を取得
-            headers = self.worksheet.row_values(1)
-            try:
-                col_number = headers.index(column) + 1
-            except ValueError:
-                try:
-                    # 英語列名も試す
-                    english_columns = {'実行済み': 'executed', '決済済み': 'closed'}
-                    english_column = english_columns.get(column, column)
-                    col_number = headers.index(english_column) + 1
-                except ValueError:
-                    self.logger.warning(f"列が見つかりません: {column}")
-                    return False
-            
-            # セルを更新
-            self.worksheet.update_cell(row_number, col_number, value)
-            self.logger.info(f"Google Sheets更新完了: {trade_id} {column}={value}")
+            # キャッシュ済みのヘッダーから列番号を取得（日本語列名 -> 英語列名の順）
+            col_number = next(
+                (self._column_numbers[alias] for alias in COLUMN_ALIASES[field] if alias in self._column_numbers),
+                None
+            )
+            if col_number is None:
+                self.logger.warning(f"列が見つかりません: {COLUMN_ALIASES[field][0]}")
+                return False
+            
+            self._pending_updates.append({
+                'range': gspread.utils.rowcol_to_a1(row_number, col_number),
+                'values': [[value]]
+            })
+            self._unsaved_marks += 1
+            
+            if self._save_due():
+                return self.flush()
             return True
             
         except Exception as e:
             self.logger.error(f"Google Sheets更新エラー: {e}")
             return False
+    
+    def flush(self) -> bool:
+        """未送信のセル更新をbatch_updateで一括送信"""
+        if not self._pending_updates:
+            return True
+        
+        try:
+            self.worksheet.batch_update(self._pending_updates)
+            self.logger.info(f"Google Sheets更新完了: {len(self._pending_updates)}セル")
+            self._pending_updates = []
+            self._unsaved_marks = 0
+            self._last_saved = time.monotonic()
+            return True
+        except Exception as e:
+            self.logger.error(f"Google Sheets更新エラー: {e}")
+            return False
 
 class DataReaderFactory:
     """データリーダーのファクトリークラス"""
@@ -678,49 +832,56 @@ class TradeScheduleManager:
         self.data_reader = data_reader
         self.trades_data = []
         self.logger = logging.getLogger(__name__)
+        self._build_index()
     
     def load_data(self) -> bool:
         """データを読み込み"""
         try:
             self.trades_data = self.data_reader.read_data()
+            self._build_index()
             return len(self.trades_data) > 0
         except Exception as e:
             self.logger.error(f"データ読み込みエラー: {e}")
             return False
     
-    def get_trades_for_time(self, current_time: datetime, tolerance_seconds: int = 15) -> List[Dict]:
-        """指定時間のエントリー対象トレードを取得"""
-        target_trades = []
+    def _build_index(self):
+        """時刻・フラグを列ごとのNumPy配列に展開（毎ティックの検索用）"""
+        trades = self.trades_data
+        # 時刻はint64（マイクロ秒）で保持。NaTはint64の最小値になるので常に範囲外
+        self._entry_times = np.array([trade.entry_time for trade in trades], dtype='datetime64[us]').view(np.int64)
+        self._exit_times = np.array([trade.exit_time for trade in trades], dtype='datetime64[us]').view(np.int64)
+        self._executed = np.array([trade.executed for trade in trades], dtype=bool)
+        self._closed = np.array([trade.closed for trade in trades], dtype=bool)
+        self._pending = ~self._executed
         
-        for trade in self.trades_data:
-            if trade.get('executed', False):
-                continue
-            
-            entry_time = trade.get('entry_time')
-            if not entry_time:
-                continue
-            
-            time_diff = (current_time - entry_time).total_seconds()
-            if 0 <= time_diff <= tolerance_seconds:
-                target_trades.append(trade)
-        
-        return target_trades
+        # 時刻順に並べた配列を用意し、毎ティックの検索は二分探索で窓を切り出す
+        self._entry_order = np.argsort(self._entry_times, kind='stable')
+        self._entry_sorted = self._entry_times[self._entry_order]
+        self._exit_order = np.argsort(self._exit_times, kind='stable')
+        self._exit_sorted = self._exit_times[self._exit_order]
+    
+    def _select(self, indices: np.ndarray) -> List[Trade]:
+        """該当する行番号のトレードを元の順序で返す"""
+        return [self.trades_data[i] for i in np.sort(indices)]
+    
+    @staticmethod
+    def _window(sorted_times: np.ndarray, order: np.ndarray, current_time: datetime, tolerance_seconds: int) -> np.ndarray:
+        """[current_time - tolerance, current_time] に入る行番号を二分探索で取得"""
+        window_end = np.datetime64(current_time, 'us').astype(np.int64)
+        window_start = window_end - tolerance_seconds * 1_000_000
+        lo = np.searchsorted(sorted_times, window_start, side='left')
+        hi = np.searchsorted(sorted_times, window_end, side='right')
+        return order[lo:hi]
+    
+    def get_trades_for_time(self, current_time: datetime, tolerance_seconds: int = 15) -> List[Trade]:
+        """指定時間のエントリー対象トレードを取得"""
+        indices = self._window(self._entry_sorted, self._entry_order, current_time, tolerance_seconds)
+        return self._select(indices[self._pending[indices]])
     
-    def get_trades_to_close(self, current_time: datetime, tolerance_seconds: int = 15) -> List[Dict]:
+    def get_trades_to_close(self, current_time: datetime, tolerance_seconds: int = 15) -> List[Trade]:
         """指定時間の決済対象トレードを取得（メモリベース実行管理対応）"""
-        target_trades = []
-        
-        for trade in self.trades_data:
-            # メモリベースの実行管理では、CSVフラグは無視して時刻のみでチェック
-            exit_time = trade.get('exit_time')
-            if not exit_time:
-                continue
-            
-            time_diff = (current_time - exit_time).total_seconds()
-            if 0 <= time_diff <= tolerance_seconds:
-                target_trades.append(trade)
-        
-        return target_trades
+        # メモリベースの実行管理では、CSVフラグは無視して時刻のみでチェック
+        return self._select(self._window(self._exit_sorted, self._exit_order, current_time, tolerance_seconds))
     
     def mark_trade_executed(self, trade_id: str) -> bool:
         """トレード実行済みマーク"""
@@ -730,11 +891,15 @@ class TradeScheduleManager:
         """トレード決済済みマーク"""
         return self.data_reader.mark_trade_closed(trade_id)
     
+    def close(self):
+        """データリーダーの保留中の書き込みを反映"""
+        self.data_reader.close()
+    
     def get_trade_summary(self) -> Dict:
         """トレードデータの概要を取得"""
         total = len(self.trades_data)
-        executed = sum(1 for trade in self.trades_data if trade.get('executed', False))
-        closed = sum(1 for trade in self.trades_data if trade.get('closed', False))
+        executed = int(self._executed.sum())
+        closed = int(self._closed.sum())
         
         return {
             'total': total,
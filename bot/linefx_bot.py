@@ -1,22 +1,124 @@
 import asyncio
+import atexit
+import copy
+import heapq
 import json
 import logging
+import logging.handlers
 import os
-import random
+import queue
+import re
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
+from urllib.parse import urlsplit
 
-from playwright.async_api import async_playwright, Browser, Page
-from data_reader import DataReaderFactory, TradeScheduleManager
+import numpy as np
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from data_reader import DataReaderFactory, Trade, TradeScheduleManager, load_json_cached, load_trading_settings
+
+try:
+    import orjson
+    _json_dumps = lambda obj: orjson.dumps(obj).decode()
+except ImportError:
+    _json_dumps = lambda obj: json.dumps(obj, ensure_ascii=False)
+
+# 自動化検出回避スクリプト（import時に一度だけ読み込む）
+_STEALTH_JS = (Path(__file__).parent / "stealth.js").read_text(encoding="utf-8")
+
+
+class _JsonLogFormatter(logging.Formatter):
+    """ログファイル用に1レコードを1行のJSONにする"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {"ts": record.created, "lvl": record.levelname, "msg": record.getMessage()}
+        # logger.exceptionのトレースバックとstack_infoも残す
+        exc = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc:
+            entry["exc"] = exc
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return _json_dumps(entry)
+
+
+# キューへ渡す前にトレースバックを文字列化するためのフォーマッター
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class _LogQueueHandler(logging.handlers.QueueHandler):
+    """書き込みスレッドへ渡す前にメッセージと例外情報を文字列化する（書式は書き込み側のハンドラーで付ける）"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 標準のprepareはトレースバックをメッセージに埋め込んでexc_textを消すため、別の属性のまま渡す
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _local_epoch(dt: datetime) -> float:
+    """ナイーブな日時をローカル時刻としてepoch秒に変換（pandas.Timestampも同じ扱いにする）"""
+    return time.mktime(dt.timetuple()) + dt.microsecond / 1_000_000
 
 
 class LineFXBot:
     """LINE FX自動取引ボット - Python版"""
     
+    # find_elementをこの回数呼ぶごとにセレクターをヒット数順に並べ替える
+    SELECTOR_REORDER_EVERY = 20
+    # 優先順位の低いセレクターが先に見つかったとき、より高い候補の結果を待つ最長秒数
+    SELECTOR_PRIORITY_GRACE = 0.3
+    # 数量のプラスボタンを1回のevaluateでクリックする最大回数
+    QUANTITY_CLICK_BATCH = 10
+    # 保存済みログインセッションを復元する有効期間（秒）
+    STORAGE_STATE_MAX_AGE = 12 * 60 * 60
+    # 全決済（一括決済）ボタンの候補
+    BULK_SETTLE_SELECTORS = (
+        'button.button-position-collective-settlement.settle-all.only-position',
+        'button:has-text("全決済")',
+        'button[class*="collective-settlement"]',
+        'button[class*="settle-all"]',
+    )
+    # 注文（Ask/Bid）ボタン
+    ASK_BUTTON_SELECTOR = 'button.button-order-ask'
+    BID_BUTTON_SELECTOR = 'button.button-order-bid'
+    # Playwrightドライバーとブラウザはイベントループ内で使い回す（セッションごとに作るのはBrowserContextのみ）
+    # ブラウザは起動設定 (headless, 起動引数) ごとに1つ起動する
+    _playwright = None
+    _shared_browsers: Dict[tuple, Browser] = {}
+    # ロックとドライバーは作成したイベントループに結び付くため、ループごとに作り直す
+    _playwright_loop = None
+    _playwright_lock: Optional[asyncio.Lock] = None
+    # メニュー名 -> リンク文言の照合パターン（語の間の空白・改行の揺れを許容）
+    MENU_PATTERNS = {
+        "新規注文": re.compile(r"新規\s*注文"),
+        "決済注文": re.compile(r"決済\s*注文"),
+        "建玉サマリ": re.compile(r"建玉\s*サマリ"),
+    }
+    # 口座情報の項目名 -> get_positionsの戻り値のキー（先に一致したものを採用）
+    ACCOUNT_INFO_KEYS = (
+        ('証拠金維持率', 'margin_ratio'),
+        ('資産合計', 'total_assets'),
+        ('評価損益', 'unrealized_pnl'),
+    )
+    # 待機・タイピング用の乱数を一度に生成する個数
+    RANDOM_POOL_SIZE = 4096
+    # 実行・決済マークの書き込みをまとめる間隔（秒）と1回の最大件数
+    MARK_FLUSH_INTERVAL = 1.0
+    MARK_BATCH_SIZE = 32
+    
     def __init__(self, config_path: str = None):
+        # 共有ブラウザ（永続コンテキスト使用時はBrowserを持たないためNone）と、このセッションのコンテキスト
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.settings = None
         self.base_path = Path(__file__).parent.parent
@@ -28,11 +130,49 @@ class LineFXBot:
         self.running = False
         
         # 実行状況管理（メモリ内）
-        self.executed_trades = set()  # 実行済みトレードID
-        self.closed_trades = set()    # 決済済みトレードID
+        # トレードIDはデータリーダー側でintern済みのため、照合はほぼ参照比較で済む
+        self.executed_trades: Set[str] = set()  # 実行済みトレードID
+        self.closed_trades: Set[str] = set()    # 決済済みトレードID
         self.prepared_trades = {}     # 事前準備済みトレード
         self.prepared_closings = {}   # 決済事前準備済みトレード
         
+        # データソースへの実行・決済マークはキューに積み、バックグラウンドでまとめて書き込む
+        self._mark_queue: asyncio.Queue = asyncio.Queue()
+        self._mark_writer_task: Optional[asyncio.Task] = None
+        # 書き込みスレッドとデータ再読み込みが同じリーダーを同時に触らないためのロック
+        self._data_lock = threading.Lock()
+        
+        # 待機・タイピングの揺らぎ用の乱数（NumPyでまとめて生成し、1つずつ取り出して使う）
+        self._rng = np.random.default_rng()
+        self._random_pool: List[float] = []
+        
+        # セレクター（タプル化したもの）とヒット数
+        self._selectors = {}
+        self._selector_hits = Counter()
+        self._find_calls = 0
+        # (ページURL, セレクター候補) -> 前回見つかったセレクター
+        self._selector_cache: Dict[tuple, str] = {}
+        
+        # スクリーンショット設定（load_settingsで確定）
+        self._screenshot_enabled = False
+        self._screenshot_dir = None
+        # 撮影はバックグラウンドで行い、同時実行数を制限
+        self._screenshot_sem = asyncio.Semaphore(2)
+        self._screenshot_tasks: Set[asyncio.Task] = set()
+        # 画面操作（クリック～確認ダイアログ）を直列化するためのロック
+        self._ui_lock = asyncio.Lock()
+        # 並行実行する事前準備の同時実行数
+        self._prep_sem = asyncio.Semaphore(3)
+        # スケジュール再読み込みの通知（メインループの待機を解除する）
+        self._reload_event = asyncio.Event()
+        
+        # 注文ボタンのロケーター（init_browserで作成）
+        self._ask_button = None
+        self._bid_button = None
+        self._order_confirm_button = None
+        # 事前準備済み注文のクリックに使うCDPセッション（Chromiumのみ）
+        self._cdp = None
+        
         self.setup_logging()
         
     def setup_logging(self):
@@ -40,27 +180,59 @@ class LineFXBot:
         log_dir = self.base_path / "logs"
         log_dir.mkdir(exist_ok=True)
         
-        log_file = log_dir / f"bot_{datetime.now().strftime('%Y-%m-%d')}.log"
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='[%(asctime)s] [%(levelname)s] %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # 設定済みなら再設定しない
+        if not logging.getLogger().handlers:
+            # 当日分は bot.log、日付が変わったら前日分を bot_YYYY-MM-DD.log にローテーション
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_dir / "bot.log", when="midnight", encoding='utf-8'
+            )
+            file_handler.namer = lambda name: str(log_dir / f"bot_{name.rsplit('.', 1)[-1]}.log")
+            # ファイルへはJSON Linesで書き込む（取引記録を失わないよう1レコードずつ書き出す）
+            file_handler.setFormatter(_JsonLogFormatter())
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter('[%(asctime)s] [%(levelname)s] %(message)s'))
+            
+            # ファイル・コンソールへの書き込みは専用スレッドで行い、イベントループを止めない
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+            listener.start()
+            atexit.register(listener.stop)
+            
+            root_logger = logging.getLogger()
+            root_logger.setLevel(logging.INFO)
+            root_logger.addHandler(_LogQueueHandler(log_queue))
         self.logger = logging.getLogger(__name__)
         
     async def load_settings(self):
         """設定ファイルを読み込み"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                self.settings = json.load(f)
+            # 変更がなければ前回の解析結果を再利用（更新時刻が変われば読み直す）
+            self.settings = load_json_cached(self.config_path)
+            self._selectors = self._freeze_selectors(self.settings["selectors"])
+            
+            # 待機・タイピング等の頻繁に参照する設定値を属性に展開
+            bot_settings = self.settings["bot_settings"]
+            wait_time = bot_settings["wait_time"]
+            self._wait_min, self._wait_max, self._wait_var = wait_time["min"], wait_time["max"], wait_time["random_variance"]
+            typing_delay = bot_settings["typing_delay"]
+            self._typing_min, self._typing_max = typing_delay["min"], typing_delay["max"]
+            self._headless = bot_settings["headless"]
+            self._timeout = bot_settings["timeout"]
+            
+            # スクリーンショットの保存先は一度だけ作成
+            self._screenshot_enabled = bot_settings["screenshot_enabled"]
+            self._screenshot_dir = self.base_path / self.settings["paths"]["screenshots"]
+            # 通常は表示範囲のみをJPEGで保存し、エラー時だけページ全体をPNGで残す（設定で変更可）
+            screenshot_options = bot_settings.get("screenshot_options", {})
+            self._screenshot_type = screenshot_options.get("format", "jpeg")
+            self._screenshot_quality = screenshot_options.get("quality", 60)
+            self._screenshot_full_page = screenshot_options.get("full_page", False)
+            self._screenshot_error_full_page = screenshot_options.get("on_error_full_page", True)
+            if self._screenshot_enabled:
+                self._screenshot_dir.mkdir(exist_ok=True)
             self.logger.info("設定ファイルを正常に読み込みました")
             
             # trading_settings.jsonも読み込み
-            from data_reader import load_trading_settings
             config_dir = os.path.dirname(self.config_path)
             self.trading_config = load_trading_settings(config_dir)
             
@@ -72,101 +244,258 @@ class LineFXBot:
             self.logger.error(f"設定ファイルの読み込みに失敗: {e}")
             raise
             
-    async def take_screenshot(self, name: str):
-        """スクリーンショットを撮影"""
-        if not self.settings["bot_settings"]["screenshot_enabled"] or not self.page:
+    def take_screenshot(self, name: str):
+        """スクリーンショットの撮影をバックグラウンドで開始する（呼び出し側は待たずに次の操作へ進む）"""
+        if not self._screenshot_enabled or not self.page:
             return
             
+        timestamp = time.time_ns() // 1_000_000
+        if self._screenshot_error_full_page and name.startswith("error"):
+            options = {"type": "png", "full_page": True}
+        else:
+            options = {"type": self._screenshot_type, "full_page": self._screenshot_full_page}
+            if self._screenshot_type == "jpeg":
+                options["quality"] = self._screenshot_quality
+        suffix = "jpg" if options["type"] == "jpeg" else "png"
+        screenshot_path = self._screenshot_dir / f"{name}_{timestamp}.{suffix}"
+        
+        task = asyncio.create_task(self._save_screenshot(self.page, screenshot_path, options))
+        self._screenshot_tasks.add(task)
+        task.add_done_callback(self._screenshot_tasks.discard)
+        
+    async def _save_screenshot(self, page: Page, screenshot_path: Path, options: Dict):
+        """スクリーンショットを保存（take_screenshotからバックグラウンドで実行）"""
         try:
-            screenshot_dir = self.base_path / self.settings["paths"]["screenshots"]
-            screenshot_dir.mkdir(exist_ok=True)
-            
-            timestamp = int(time.time() * 1000)
-            screenshot_path = screenshot_dir / f"{name}_{timestamp}.png"
-            
-            await self.page.screenshot(path=str(screenshot_path), full_page=True)
+            async with self._screenshot_sem:
+                await page.screenshot(path=str(screenshot_path), **options)
             self.logger.info(f"スクリーンショット保存: {screenshot_path}")
         except Exception as e:
             self.logger.error(f"スクリーンショット撮影失敗: {e}")
             
+    async def flush_screenshots(self):
+        """撮影中のスクリーンショットの完了を待つ（ブラウザ終了前に呼ぶ）"""
+        if self._screenshot_tasks:
+            await asyncio.gather(*self._screenshot_tasks, return_exceptions=True)
+            
+    def _next_random(self) -> float:
+        """[0, 1) の一様乱数を事前生成したプールから取り出す"""
+        if not self._random_pool:
+            self._random_pool = self._rng.random(self.RANDOM_POOL_SIZE).tolist()
+        return self._random_pool.pop()
+        
+    def _rand_int(self, low: int, high: int) -> int:
+        """low以上high以下の整数乱数（random.randint相当）"""
+        return low + int(self._next_random() * (high - low + 1))
+        
     async def random_wait(self, base_time: int = None):
         """ランダム待機時間"""
-        wait_settings = self.settings["bot_settings"]["wait_time"]
-        
         if base_time is None:
-            base = random.randint(wait_settings["min"], wait_settings["max"])
+            base = self._rand_int(self._wait_min, self._wait_max)
         else:
             base = base_time
             
-        variance = base * wait_settings["random_variance"]
-        final_wait = base + random.uniform(-variance, variance)
+        # ±variance の揺らぎを1回の乱数で計算
+        variance = base * self._wait_var
+        final_wait = base + variance * (2 * self._next_random() - 1)
         final_wait = max(100, final_wait) / 1000  # ミリ秒を秒に変換
         
-        self.logger.debug(f"待機時間: {final_wait:.2f}秒")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("待機時間: %.2f秒", final_wait)
         await asyncio.sleep(final_wait)
         
     async def type_with_delay(self, element, text: str):
         """遅延付きタイピング"""
-        typing_settings = self.settings["bot_settings"]["typing_delay"]
-        
-        for char in text:
-            await element.type(char)
-            delay = random.randint(typing_settings["min"], typing_settings["max"]) / 1000
-            await asyncio.sleep(delay)
+        # 文字間の遅延はPlaywright側に任せ、1回の呼び出しで入力する（遅延はフィールドごとにランダム）
+        delay = self._rand_int(self._typing_min, self._typing_max)
+        # Locatorではtypeが非推奨のためpress_sequentiallyを使う（ElementHandleにはtypeしかない）
+        press = getattr(element, 'press_sequentially', None) or element.type
+        await press(text, delay=delay)
+            
+    @classmethod
+    def _freeze_selectors(cls, selectors):
+        """設定のセレクターリストを（入れ子の辞書も含めて）タプルに変換"""
+        if isinstance(selectors, dict):
+            return {key: cls._freeze_selectors(value) for key, value in selectors.items()}
+        if isinstance(selectors, list):
+            return tuple(selectors)
+        return selectors
+    
+    def _reorder_selectors(self, selectors=None):
+        """キャッシュ済みセレクターをヒット数の多い順に並べ替え（同数なら元の順序）"""
+        if selectors is None:
+            selectors = self._selectors
+        for key, value in selectors.items():
+            if isinstance(value, dict):
+                self._reorder_selectors(value)
+            elif isinstance(value, tuple):
+                selectors[key] = tuple(sorted(value, key=lambda s: -self._selector_hits[s]))
             
     async def find_element(self, selectors: List[str], timeout: int = 5000):
         """複数セレクターでの要素検索"""
-        for selector in selectors:
+        self._find_calls += 1
+        if self._find_calls % self.SELECTOR_REORDER_EVERY == 0:
+            self._reorder_selectors()
+        
+        # 同じ画面で前回見つかったセレクターがあれば、まずそれだけを短時間待つ
+        cache_key = (self.page.url.split('?', 1)[0], tuple(selectors))
+        cached = self._selector_cache.get(cache_key)
+        if cached is not None:
             try:
-                element = await self.page.wait_for_selector(selector, timeout=timeout)
-                if element:
-                    self.logger.debug(f"要素発見 - セレクター: {selector}")
-                    return element
+                element = await self.page.wait_for_selector(cached, state='visible', timeout=min(timeout, 500))
             except Exception:
-                self.logger.debug(f"セレクター失敗: {selector}")
-                continue
-                
-        raise Exception(f"要素が見つかりません - セレクター: {selectors}")
+                element = None
+            if element:
+                self._selector_hits[cached] += 1
+                return element
+            del self._selector_cache[cache_key]
+        
+        async def probe(priority: int, selector: str):
+            return priority, selector, await self.page.wait_for_selector(selector, state='visible', timeout=timeout)
+        
+        found = []
+        
+        def collect(done_tasks):
+            for task in done_tasks:
+                try:
+                    result = task.result()
+                except Exception:
+                    continue
+                if result[2]:
+                    found.append(result)
+        
+        # 全セレクターを同時に待ち（待ち時間は合計ではなく最大になる）、
+        # 見つかった中で最も優先順位が高い（リストの前にある）ものを採用する
+        priorities = {asyncio.create_task(probe(i, selector)): i for i, selector in enumerate(selectors)}
+        pending = set(priorities)
+        chosen = None
+        try:
+            while pending and not found:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            
+            if found:
+                # より優先順位の高い候補がまだ待機中なら、短時間だけその結果を待つ
+                best = min(item[0] for item in found)
+                higher = {task for task in pending if priorities[task] < best}
+                if higher:
+                    done, _ = await asyncio.wait(higher, timeout=self.SELECTOR_PRIORITY_GRACE)
+                    pending -= done
+                    collect(done)
+                chosen = min(found, key=lambda item: item[0])
+        finally:
+            for task in pending:
+                task.cancel()
+            # 採用しなかった要素のハンドルはブラウザ側で解放する
+            for item in found:
+                if item is not chosen:
+                    try:
+                        await item[2].dispose()
+                    except Exception:
+                        pass
+        
+        if chosen is None:
+            raise Exception(f"要素が見つかりません - セレクター: {selectors}")
+        
+        _, selector, element = chosen
+        self._selector_hits[selector] += 1
+        self._selector_cache[cache_key] = selector
+        self.logger.debug("要素発見 - セレクター: %s", selector)
+        return element
+        
+    def _combined_locator(self, selectors):
+        """セレクター候補をor_で1つのロケーターにまとめる"""
+        locator = self.page.locator(selectors[0])
+        for selector in selectors[1:]:
+            locator = locator.or_(self.page.locator(selector))
+        return locator
+        
+    async def _first_present(self, selectors):
+        """全セレクターの件数を同時に調べ、リスト順で最初に存在するもののロケーターを返す（無ければNone）"""
+        locators = [self.page.locator(selector) for selector in selectors]
+        counts = await asyncio.gather(*(locator.count() for locator in locators), return_exceptions=True)
+        for selector, locator, count in zip(selectors, locators, counts):
+            if not isinstance(count, BaseException) and count > 0:
+                self.logger.info("要素発見 - セレクター: %s", selector)
+                return locator.first
+        return None
+        
+    async def find_any(self, selectors, timeout: int = 5000):
+        """いずれかのセレクターに一致する要素を1回の待機で探す（見つからなければNone）"""
+        locator = self._combined_locator(selectors).first
+        
+        try:
+            await locator.wait_for(timeout=timeout)
+        except Exception:
+            return None
+        return locator
         
     async def init_browser(self):
         """ブラウザを初期化"""
         try:
             self.logger.info("ブラウザを初期化中...")
             
-            playwright = await async_playwright().start()
-            
-            self.browser = await playwright.chromium.launch(
-                headless=self.settings["bot_settings"]["headless"],
-                args=self.settings["browser_settings"]["extra_args"]
-            )
+            browser_settings = self.settings["browser_settings"]
+            user_data_dir = browser_settings.get("user_data_dir")
+            
+            if user_data_dir:
+                # プロファイルを保持する永続コンテキスト（ログイン状態が再起動後も残る）
+                playwright = await self._get_playwright()
+                context = await playwright.chromium.launch_persistent_context(
+                    user_data_dir=str(self.base_path / user_data_dir),
+                    headless=self._headless,
+                    args=browser_settings["extra_args"],
+                    viewport=browser_settings["viewport"],
+                    user_agent=browser_settings["user_agent"]
+                )
+                # 永続コンテキストはBrowserを介さずに起動され、context.close()がブラウザ終了を兼ねる
+                self.browser = None
+            else:
+                self.browser = await self._get_shared_browser(browser_settings["extra_args"])
+                
+                # ブラウザコンテキスト作成（保存済みのログインセッションが新しければ復元）
+                storage_state = self._storage_state_path()
+                if storage_state and storage_state.exists() and time.time() - storage_state.stat().st_mtime < self.STORAGE_STATE_MAX_AGE:
+                    self.logger.info(f"保存済みセッションを復元: {storage_state}")
+                else:
+                    storage_state = None
+                context = await self.browser.new_context(
+                    viewport=browser_settings["viewport"],
+                    user_agent=browser_settings["user_agent"],
+                    storage_state=str(storage_state) if storage_state else None
+                )
             
-            # ブラウザコンテキスト作成
-            context = await self.browser.new_context(
-                viewport=self.settings["browser_settings"]["viewport"],
-                user_agent=self.settings["browser_settings"]["user_agent"]
-            )
+            self.context = context
             
             # 自動化検出を回避するJavaScriptを実行
-            await context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined,
-                });
-                
-                window.chrome = {
-                    runtime: {},
-                };
-                
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5],
-                });
-                
-                Object.defineProperty(navigator, 'languages', {
-                    get: () => ['ja-JP', 'ja'],
-                });
-            """)
+            await context.add_init_script(_STEALTH_JS)
+            
+            # 取引に不要なリソース（画像など）の読み込みを止める
+            blocked_types = frozenset(browser_settings.get("block_resource_types", []))
+            if blocked_types:
+                async def block_resources(route):
+                    if route.request.resource_type in blocked_types:
+                        await route.abort()
+                    else:
+                        await route.continue_()
+                await context.route("**/*", block_resources)
+                self.logger.info(f"リソースブロック: {sorted(blocked_types)}")
+            
+            self.page = context.pages[0] if context.pages else await context.new_page()
+            self.page.set_default_timeout(self._timeout)
+            
+            # 注文時に使うボタンのロケーターを一度だけ作成（DOMの変化には自動で追従する）
+            self._ask_button = self.page.locator(self.ASK_BUTTON_SELECTOR).first
+            self._bid_button = self.page.locator(self.BID_BUTTON_SELECTOR).first
+            self._order_confirm_button = self.page.locator('button.button-large.button-confirm').first
+            
+            # 事前準備済み注文はPlaywrightの操作可能性チェックを省き、CDPで直接クリックする
+            try:
+                self._cdp = await context.new_cdp_session(self.page)
+            except Exception as e:
+                self._cdp = None
+                self.logger.warning(f"CDPセッションを作成できません（通常のクリックを使用）: {e}")
             
-            self.page = await context.new_page()
-            self.page.set_default_timeout(self.settings["bot_settings"]["timeout"])
+            await self.preconnect()
             
             self.logger.info("ブラウザ初期化完了")
             
@@ -174,6 +503,90 @@ class LineFXBot:
             self.logger.error(f"ブラウザ初期化失敗: {e}")
             raise
             
+    @classmethod
+    def _get_playwright_lock(cls) -> asyncio.Lock:
+        """実行中のイベントループ用のロックを取得（ループが変わっていれば前のループのドライバーは破棄）"""
+        loop = asyncio.get_running_loop()
+        if cls._playwright_loop is not loop:
+            # 別のasyncio.runで起動したドライバー・ブラウザはこのループからは操作できない
+            cls._playwright_loop = loop
+            cls._playwright_lock = asyncio.Lock()
+            cls._playwright = None
+            cls._shared_browsers = {}
+        return cls._playwright_lock
+            
+    @classmethod
+    async def _get_playwright(cls):
+        """Playwrightドライバーを取得（初回のみ起動）"""
+        async with cls._get_playwright_lock():
+            if cls._playwright is None:
+                cls._playwright = await async_playwright().start()
+            return cls._playwright
+            
+    async def _get_shared_browser(self, args: List[str]) -> Browser:
+        """起動設定が同じ共有ブラウザを取得（未起動または切断されていれば起動）"""
+        playwright = await self._get_playwright()
+        cls = type(self)
+        key = (self._headless, tuple(args))
+        async with cls._get_playwright_lock():
+            browser = cls._shared_browsers.get(key)
+            if browser is None or not browser.is_connected():
+                browser = await playwright.chromium.launch(headless=self._headless, args=args)
+                cls._shared_browsers[key] = browser
+            else:
+                self.logger.info("起動済みのブラウザを再利用")
+            return browser
+            
+    async def close_browser(self):
+        """このセッションのブラウザコンテキストを閉じる（共有ブラウザは残す）"""
+        if self.context is None:
+            return
+        await self.flush_screenshots()
+        # 永続コンテキストの場合はcontext.close()がブラウザ終了を兼ねる
+        await self.context.close()
+        self.context = None
+        self.browser = None
+        self.logger.info("ブラウザを終了しました")
+        
+    @classmethod
+    async def shutdown_shared_browser(cls):
+        """共有ブラウザとPlaywrightドライバーを終了（プロセス終了時に呼ぶ）"""
+        async with cls._get_playwright_lock():
+            browsers, cls._shared_browsers = list(cls._shared_browsers.values()), {}
+            for browser in browsers:
+                await browser.close()
+            if cls._playwright is not None:
+                await cls._playwright.stop()
+                cls._playwright = None
+            
+    def _storage_state_path(self) -> Optional[Path]:
+        """ログインセッションの保存先（browser_settings.storage_state_file未設定ならNone）"""
+        storage_state_file = self.settings["browser_settings"].get("storage_state_file")
+        return self.base_path / storage_state_file if storage_state_file else None
+        
+    async def preconnect(self):
+        """ログイン先などのオリジンへ事前接続し、最初の遷移からDNS・TLSの待ち時間を除く"""
+        login_url = urlsplit(self.settings["login"]["url"])
+        origins = self.settings["browser_settings"].get(
+            "preconnect_origins", [f"{login_url.scheme}://{login_url.netloc}"]
+        )
+        try:
+            await self.page.evaluate(
+                """(origins) => {
+                    for (const origin of origins) {
+                        const link = document.createElement('link');
+                        link.rel = 'preconnect';
+                        link.href = origin;
+                        link.crossOrigin = '';
+                        document.head.appendChild(link);
+                    }
+                }""",
+                origins
+            )
+            self.logger.info(f"事前接続: {origins}")
+        except Exception as e:
+            self.logger.warning(f"事前接続に失敗（継続します）: {e}")
+            
     async def login(self):
         """ログイン処理"""
         try:
@@ -182,78 +595,105 @@ class LineFXBot:
             # ログインページにアクセス
             await self.page.goto(self.settings["login"]["url"])
             await self.random_wait(2000)
-            await self.take_screenshot("01_login_page")
             
-            # ユーザーID入力
+            # 永続プロファイルのセッションが有効ならサインインページから転送される
+            if "signin" not in self.page.url:
+                self.logger.info(f"ログイン済みセッションを再利用: {self.page.url}")
+                return True
+            
+            self.take_screenshot("01_login_page")
+            
+            # 入力欄は互いに独立しているので同時に探す
+            user_id_element, password_element = await asyncio.gather(
+                self.find_element(self._selectors["userId"]),
+                self.find_element(self._selectors["password"])
+            )
+            
+            # ユーザーID入力（既存のテキストはfillで消去。キーボード操作はページ共通のため入力は1欄ずつ）
             self.logger.info("ユーザーID入力中...")
-            user_id_element = await self.find_element(self.settings["selectors"]["userId"])
-            await user_id_element.focus()
+            await user_id_element.fill("")
             await self.random_wait(500)
-            
-            # 既存のテキストを選択して削除
-            await self.page.keyboard.press("Control+a")
-            await self.random_wait(300)
             await self.type_with_delay(user_id_element, self.settings["login"]["userId"])
             
             await self.random_wait(1000)
-            await self.take_screenshot("02_userid_filled")
+            self.take_screenshot("02_userid_filled")
             
             # パスワード入力
             self.logger.info("パスワード入力中...")
-            password_element = await self.find_element(self.settings["selectors"]["password"])
-            await password_element.focus()
+            await password_element.fill("")
             await self.random_wait(500)
-            
-            await self.page.keyboard.press("Control+a")
-            await self.random_wait(300)
             await self.type_with_delay(password_element, self.settings["login"]["password"])
             
             await self.random_wait(1000)
-            await self.take_screenshot("03_password_filled")
+            self.take_screenshot("03_password_filled")
             
             # ユーザーID保存チェックボックス処理
             if not self.settings["login"]["saveUserId"]:
                 try:
                     self.logger.info("ユーザーID保存チェックボックスの処理中...")
-                    checkbox_element = await self.find_element(
-                        self.settings["selectors"]["saveUserIdCheckbox"], 2000
+                    # 検索・状態確認・チェック解除を1回のevaluateで行う
+                    unchecked = await self.page.evaluate(
+                        """(selectors) => {
+                            for (const selector of selectors) {
+                                const el = document.querySelector(selector);
+                                if (!el) continue;
+                                if (!el.checked) return false;
+                                el.click();
+                                return true;
+                            }
+                            return null;
+                        }""",
+                        list(self._selectors["saveUserIdCheckbox"])
                     )
-                    is_checked = await checkbox_element.is_checked()
-                    if is_checked:
-                        await checkbox_element.uncheck()
+                    if unchecked is None:
+                        self.logger.warning("ユーザーID保存チェックボックスが見つかりません")
+                    elif unchecked:
                         await self.random_wait(500)
                 except Exception as e:
                     self.logger.warning(f"チェックボックス処理失敗: {e}")
                     
             # ログインボタンクリック
             self.logger.info("ログインボタンをクリック中...")
-            login_button = await self.find_element(self.settings["selectors"]["loginButton"])
+            login_button = await self.find_element(self._selectors["loginButton"])
             await self.random_wait(1000)
             await login_button.click()
+            self.take_screenshot("04_after_login_click")
             
-            await self.random_wait(3000)
-            await self.take_screenshot("04_after_login_click")
-            
-            # ナビゲーション待機
+            # ナビゲーション待機（レート配信が続くためnetworkidleは待たず、サインインページからの遷移とDOM構築を待つ）
             self.logger.info("ページ遷移を待機中...")
-            await self.page.wait_for_load_state("networkidle", timeout=30000)
-            await self.random_wait(2000)
-            await self.take_screenshot("05_post_login")
+            try:
+                await self.page.wait_for_url(lambda url: "signin" not in url, wait_until="domcontentloaded", timeout=30000)
+            except Exception as e:
+                self.logger.warning(f"ページ遷移の待機がタイムアウト: {e}")
+            
+            # ログイン後の画面に必ずある要素が表示されるまで待つ
+            sentinel = self._selectors.get("postLoginSentinel")
+            if sentinel and "signin" not in self.page.url:
+                if not await self.find_any(sentinel, timeout=self._timeout):
+                    self.logger.warning("ログイン後画面の要素が見つかりません")
+            self.take_screenshot("05_post_login")
             
             # ログイン成功確認
             current_url = self.page.url
             self.logger.info(f"ログイン後URL: {current_url}")
             
             if "signin" in current_url:
-                await self.take_screenshot("06_login_failed")
+                self.take_screenshot("06_login_failed")
                 raise Exception("ログイン失敗 - サインインページに留まっています")
                 
             self.logger.info("ログイン完了!")
+            
+            # 次回起動時にログインを省略できるようセッションを保存
+            storage_state = self._storage_state_path()
+            if storage_state:
+                storage_state.parent.mkdir(parents=True, exist_ok=True)
+                await self.page.context.storage_state(path=str(storage_state))
+                self.logger.info(f"ログインセッションを保存: {storage_state}")
             return True
             
         except Exception as e:
             self.logger.error(f"ログイン失敗: {e}")
-            await self.take_screenshot("error_login_failed")
+            self.take_screenshot("error_login_failed")
             raise
             
     async def analyze_trading_page(self):
@@ -263,7 +703,7 @@ class LineFXBot:
             
             # ページが完全に読み込まれるまで待機
             await self.random_wait(3000)
-            await self.take_screenshot("06_trading_page_analysis")
+            self.take_screenshot("06_trading_page_analysis")
             
             # HTML構造を保存
             if self.trading_config.get("save_html_structure", False):
@@ -271,70 +711,85 @@ class LineFXBot:
                 html_dir = self.base_path / "debug"
                 html_file = html_dir / f"trading_page_{int(time.time())}.html"
                 
-                with open(html_file, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
+                # 数MBになることがあるため書き込みはスレッドで行う
+                await asyncio.to_thread(html_file.write_text, html_content, encoding='utf-8')
                 self.logger.info(f"HTML構造保存: {html_file}")
             
-            # 取引要素の存在確認
+            # 取引要素の存在確認とページ情報の取得を1回のevaluateでまとめて行う
+            # CSSとして解釈できないPlaywright独自のセレクター（:has-text等）しか残らない要素はnullを返す
+            selector_map = {name: list(selectors) for name, selectors in self._selectors["trading"].items()}
+            snapshot = await self.page.evaluate(
+                """(selectorMap) => ({
+                    found: Object.fromEntries(Object.entries(selectorMap).map(([name, selectors]) => {
+                        let unresolved = false;
+                        for (const selector of selectors) {
+                            try {
+                                if (document.querySelector(selector)) return [name, true];
+                            } catch (e) {
+                                unresolved = true;
+                            }
+                        }
+                        return [name, unresolved ? null : false];
+                    })),
+                    url: location.href,
+                    title: document.title
+                })""",
+                selector_map
+            )
+            
             trading_elements = {}
-            for element_name, selectors in self.settings["selectors"]["trading"].items():
-                try:
-                    element = await self.find_element(selectors, timeout=2000)
-                    if element:
-                        trading_elements[element_name] = True
-                        self.logger.info(f"取引要素発見: {element_name}")
-                except:
-                    trading_elements[element_name] = False
-                    self.logger.warning(f"取引要素未発見: {element_name}")
+            for element_name, found in snapshot["found"].items():
+                if found is None:
+                    # 候補をor_でまとめ、1回のcountで確認する
+                    found = await self._combined_locator(selector_map[element_name]).count() > 0
+                trading_elements[element_name] = found
+            
+            # 要素ごとではなく1行にまとめてログ出力
+            found_names = [name for name, found in trading_elements.items() if found]
+            missing_names = [name for name, found in trading_elements.items() if not found]
+            self.logger.info("取引要素発見: %s", found_names)
+            if missing_names:
+                self.logger.warning("取引要素未発見: %s", missing_names)
             
             # ページ情報をログ出力
-            current_url = self.page.url
-            page_title = await self.page.title()
-            self.logger.info(f"取引ページURL: {current_url}")
-            self.logger.info(f"ページタイトル: {page_title}")
+            self.logger.info(f"取引ページURL: {snapshot['url']}")
+            self.logger.info(f"ページタイトル: {snapshot['title']}")
             self.logger.info(f"発見された取引要素: {trading_elements}")
             
             return trading_elements
             
         except Exception as e:
             self.logger.error(f"取引ページ解析失敗: {e}")
-            await self.take_screenshot("error_trading_analysis")
+            self.take_screenshot("error_trading_analysis")
             raise
             
+    async def _click_menu(self, label: str, clicked_shot: str, page_shot: str):
+        """テキストが一致するメニューリンクをクリックし、画面の読み込みを待つ（照合はページ側で行う）"""
+        link = self.page.locator("a").filter(has_text=self.MENU_PATTERNS.get(label, label)).first
+        try:
+            await link.wait_for(timeout=self._timeout)
+        except Exception:
+            raise Exception(f"{label}メニューが見つかりません")
+            
+        await self.random_wait(1000)
+        await link.click()
+        self.take_screenshot(clicked_shot)
+        
+        # ページが読み込まれるまで待機
+        await self.random_wait(3000)
+        self.take_screenshot(page_shot)
+        
     async def navigate_to_new_order(self):
         """新規注文画面に移動"""
         try:
             self.logger.info("新規注文画面に移動中...")
             
-            # テキスト内容で新規注文メニューを検索
-            menu_links = await self.page.query_selector_all("a")
-            new_order_link = None
-            
-            for link in menu_links:
-                try:
-                    text = await link.inner_text()
-                    if "新規注文" in text:
-                        new_order_link = link
-                        break
-                except:
-                    continue
-                    
-            if not new_order_link:
-                raise Exception("新規注文メニューが見つかりません")
-                
-            await self.random_wait(1000)
-            await new_order_link.click()
-            await self.take_screenshot("07_new_order_menu_clicked")
-            
-            # ページが読み込まれるまで待機
-            await self.random_wait(3000)
-            await self.take_screenshot("08_new_order_page")
-            
+            await self._click_menu("新規注文", "07_new_order_menu_clicked", "08_new_order_page")
             return True
             
         except Exception as e:
             self.logger.error(f"新規注文画面への移動失敗: {e}")
-            await self.take_screenshot("error_new_order_navigation")
+            self.take_screenshot("error_new_order_navigation")
             raise
             
     async def select_currency_pair(self, currency_pair: str):
@@ -350,26 +805,27 @@ class LineFXBot:
                 'i.svg-icons.icon-dropdown',                            # 汎用（フォールバック）
             ]
             
-            dropdown_icon = None
-            for selector in dropdown_selectors:
-                try:
-                    dropdown_icon = await self.page.wait_for_selector(selector, timeout=2000)
-                    if dropdown_icon:
-                        self.logger.info(f"プルダウンアイコン発見: {selector}")
-                        break
-                except:
-                    continue
+            # 正しい注文パネル用セレクターだけを短時間待ち、その後は全候補の件数を同時に調べてリスト順で採用する
+            try:
+                await self.page.wait_for_selector(dropdown_selectors[0], timeout=2000)
+            except Exception:
+                pass
+            dropdown_icon = await self._first_present(dropdown_selectors)
                     
             if not dropdown_icon:
                 # デバッグ用：現在のページ状態をスクリーンショット
-                await self.take_screenshot("dropdown_search_failed")
+                self.take_screenshot("dropdown_search_failed")
                 raise Exception("正しい通貨プルダウンアイコンが見つかりません")
             
             # どのドロップダウンを開く前かを記録
-            await self.take_screenshot("before_dropdown_click")
+            self.take_screenshot("before_dropdown_click")
             await dropdown_icon.click()
-            await self.random_wait(1500)  # 待機時間を延長
-            await self.take_screenshot("currency_dropdown_opened")
+            # 固定時間ではなく、通貨リストが表示された時点で次へ進む
+            try:
+                await self.page.wait_for_selector('td.table-cell-left.text-jp', state='visible', timeout=3000)
+            except Exception:
+                self.logger.debug("通貨リストの表示待ちがタイムアウトしました")
+            self.take_screenshot("currency_dropdown_opened")
             
             # 正しいプルダウンリストから通貨ペア選択
             currency_selectors = [
@@ -380,62 +836,42 @@ class LineFXBot:
                 f'tr td:has-text("{currency_pair}")',                             # tr内の汎用セル
             ]
             
-            currency_option = None
-            for selector in currency_selectors:
-                try:
-                    currency_option = await self.page.wait_for_selector(selector, timeout=2000)
-                    if currency_option:
-                        self.logger.info(f"通貨ペアオプション発見: {selector}")
-                        break
-                except:
-                    continue
+            # 通貨リストの表示は上で待っているので、ここでは件数を同時に調べてリスト順で採用する
+            currency_option = await self._first_present(currency_selectors)
                     
             if not currency_option:
                 # デバッグ: 利用可能な通貨ペアをすべて表示
                 self.logger.info("利用可能な通貨ペアを検索中...")
-                all_currency_cells = await self.page.query_selector_all('td.table-cell-left.text-jp')
-                available_pairs = []
-                for cell in all_currency_cells:
-                    try:
-                        text = await cell.inner_text()
-                        clean_text = text.strip()
-                        available_pairs.append(clean_text)
-                        if currency_pair in clean_text or clean_text == currency_pair:
-                            currency_option = cell
-                            self.logger.info(f"通貨ペア発見: '{clean_text}' (検索対象: '{currency_pair}')")
-                            break
-                    except:
-                        continue
+                # 全セルのテキスト取得と照合を1回のevaluateで行う（セルごとのinner_text往復を避ける）
+                match_index, available_pairs = await self.page.evaluate(
+                    """(pair) => {
+                        const texts = [...document.querySelectorAll('td.table-cell-left.text-jp')]
+                            .map(cell => cell.innerText.trim());
+                        return [texts.findIndex(text => text.includes(pair)), texts];
+                    }""",
+                    currency_pair
+                )
                 
                 if available_pairs:
                     self.logger.info(f"利用可能な通貨ペア: {available_pairs[:10]}...")  # 最初の10個を表示
                 
-                if not currency_option:
-                    # 完全一致での再検索
-                    self.logger.info(f"完全一致で再検索: '{currency_pair}'")
-                    for cell in all_currency_cells:
-                        try:
-                            text = await cell.inner_text()
-                            if text.strip() == currency_pair:
-                                currency_option = cell
-                                self.logger.info(f"完全一致で発見: '{text.strip()}'")
-                                break
-                        except:
-                            continue
+                if match_index >= 0:
+                    currency_option = self.page.locator('td.table-cell-left.text-jp').nth(match_index)
+                    self.logger.info(f"通貨ペア発見: '{available_pairs[match_index]}' (検索対象: '{currency_pair}')")
                         
             if not currency_option:
                 raise Exception(f"通貨ペア {currency_pair} のオプションが見つかりません")
                 
             await currency_option.click()
             await self.random_wait(1000)
-            await self.take_screenshot("currency_selected")
+            self.take_screenshot("currency_selected")
             
             self.logger.info(f"通貨ペア {currency_pair} を選択しました")
             return True
             
         except Exception as e:
             self.logger.error(f"通貨ペア選択失敗: {e}")
-            await self.take_screenshot("error_currency_selection")
+            self.take_screenshot("error_currency_selection")
             raise
             
     async def set_order_quantity(self, quantity: float):
@@ -467,16 +903,23 @@ class LineFXBot:
             )
             
             # 現在値を1として、target_quantityまでプラスボタンをクリック
-            for _ in range(int(target_quantity) - 1):
-                await plus_button.click()
-                await self.random_wait(200)
+            # クリックはページ内でまとめて行い、画面の更新が追いつくようバッチごとに少し待つ
+            remaining = int(target_quantity) - 1
+            while remaining > 0:
+                batch = min(remaining, self.QUANTITY_CLICK_BATCH)
+                await plus_button.evaluate(
+                    "(button, count) => { for (let i = 0; i < count; i++) button.click(); }", batch
+                )
+                remaining -= batch
+                if remaining > 0:
+                    await asyncio.sleep(0.1)
                 
             self.logger.info(f"数量を {quantity} に設定しました")
             return True
             
         except Exception as e:
             self.logger.error(f"数量設定失敗: {e}")
-            await self.take_screenshot("error_quantity_setting")
+            self.take_screenshot("error_quantity_setting")
             raise
             
     async def execute_order(self, order_type: str):
@@ -486,20 +929,14 @@ class LineFXBot:
             
             if order_type.lower() in ['sell', 'short', '売り']:
                 # Bid（売り）ボタンをクリック
-                bid_button = await self.page.wait_for_selector(
-                    'button.button-order-bid', timeout=5000
-                )
-                await bid_button.click()
-                await self.take_screenshot("bid_order_executed")
+                await self._bid_button.click(timeout=5000)
+                self.take_screenshot("bid_order_executed")
                 self.logger.info("Bid（売り）注文を実行しました")
                 
             elif order_type.lower() in ['buy', 'long', '買い']:
                 # Ask（買い）ボタンをクリック
-                ask_button = await self.page.wait_for_selector(
-                    'button.button-order-ask', timeout=5000
-                )
-                await ask_button.click()
-                await self.take_screenshot("ask_order_executed")
+                await self._ask_button.click(timeout=5000)
+                self.take_screenshot("ask_order_executed")
                 self.logger.info("Ask（買い）注文を実行しました")
                 
             else:
@@ -510,7 +947,7 @@ class LineFXBot:
             
         except Exception as e:
             self.logger.error(f"注文実行失敗: {e}")
-            await self.take_screenshot("error_order_execution")
+            self.take_screenshot("error_order_execution")
             raise
             
     async def handle_market_order_agreement(self):
@@ -530,22 +967,18 @@ class LineFXBot:
             agreement_button = None
             for selector in agreement_selectors:
                 try:
-                    agreement_button = await self.page.wait_for_selector(selector, timeout=2000)
+                    # 表示状態になるまで待つので、別途is_visibleで確認する必要はない
+                    agreement_button = await self.page.wait_for_selector(selector, state='visible', timeout=2000)
                     if agreement_button:
-                        # ボタンが表示されているかチェック
-                        is_visible = await agreement_button.is_visible()
-                        if is_visible:
-                            self.logger.info(f"同意ボタン発見: {selector}")
-                            break
-                        else:
-                            agreement_button = None
+                        self.logger.info(f"同意ボタン発見: {selector}")
+                        break
                 except:
                     continue
                     
             if agreement_button:
                 await agreement_button.click()
                 await self.random_wait(1000)
-                await self.take_screenshot("market_order_agreement_clicked")
+                self.take_screenshot("market_order_agreement_clicked")
                 self.logger.info("成り行き注文に同意しました")
                 return True
             else:
@@ -555,7 +988,7 @@ class LineFXBot:
         except Exception as e:
             # 例外が発生しても継続する
             self.logger.warning(f"成り行き注文同意処理で例外発生（継続します）: {e}")
-            await self.take_screenshot("market_order_agreement_error")
+            self.take_screenshot("market_order_agreement_error")
             return True
             
     async def prepare_order(self, currency_pair: str, amount: float):
@@ -577,7 +1010,7 @@ class LineFXBot:
             
         except Exception as e:
             self.logger.error(f"注文事前準備失敗: {e}")
-            await self.take_screenshot("error_order_preparation")
+            self.take_screenshot("error_order_preparation")
             raise
     
     async def execute_prepared_order(self, order_type: str):
@@ -596,7 +1029,7 @@ class LineFXBot:
             
         except Exception as e:
             self.logger.error(f"準備済み注文実行失敗: {e}")
-            await self.take_screenshot("error_prepared_order_execution")
+            self.take_screenshot("error_prepared_order_execution")
             raise
     
     async def place_order(self, order_type: str, amount: float = None, currency_pair: str = None):
@@ -619,7 +1052,7 @@ class LineFXBot:
             
         except Exception as e:
             self.logger.error(f"注文実行失敗: {e}")
-            await self.take_screenshot(f"error_{order_type}_order_failed")
+            self.take_screenshot(f"error_{order_type}_order_failed")
             raise
             
     async def close_position_by_currency(self, currency_pair: str):
@@ -630,14 +1063,19 @@ class LineFXBot:
             # 建玉決済ボタンを検索
             settle_button_selector = f'button.button-order-settle:has-text("{currency_pair}")'
             
-            try:
-                settle_button = await self.page.wait_for_selector(
-                    settle_button_selector, timeout=5000
-                )
-                
-                if settle_button:
+            # 決済ボタンの探索からクリック・確認ダイアログまでを1通貨ずつ行う
+            # （他の決済でポジション一覧が再描画されるため、ボタンはロック内でロケーターから解決する）
+            async with self._ui_lock:
+                try:
+                    settle_button = self.page.locator(settle_button_selector).first
+                    try:
+                        await settle_button.wait_for(state='visible', timeout=5000)
+                    except Exception:
+                        self.logger.warning(f"{currency_pair} の決済ボタンが見つかりません。ポジションがない可能性があります。")
+                        return False
+                    
                     await settle_button.click()
-                    await self.take_screenshot(f"close_position_{currency_pair.replace('/', '_')}")
+                    self.take_screenshot(f"close_position_{currency_pair.replace('/', '_')}")
                     
                     # 決済確認ダイアログが出た場合の処理
                     await self.random_wait(1000)
@@ -651,95 +1089,78 @@ class LineFXBot:
                         '.dialog button.confirm'
                     ]
                     
-                    for selector in confirm_selectors:
-                        try:
-                            confirm_button = await self.page.wait_for_selector(
-                                selector, timeout=2000
-                            )
-                            if confirm_button:
-                                await confirm_button.click()
-                                await self.take_screenshot("position_close_confirmed")
-                                break
-                        except:
-                            continue
+                    confirm_button = await self.find_any(confirm_selectors, timeout=2000)
+                    if confirm_button:
+                        await confirm_button.click()
+                        self.take_screenshot("position_close_confirmed")
                     
                     await self.random_wait(2000)
                     self.logger.info(f"{currency_pair} の一括決済を実行しました")
                     return True
-                    
-                else:
-                    self.logger.warning(f"{currency_pair} の決済ボタンが見つかりません。ポジションがない可能性があります。")
+                except Exception as e:
+                    self.logger.warning(f"{currency_pair} の決済ボタンを操作できません: {e}")
                     return False
-                    
-            except Exception as e:
-                self.logger.warning(f"{currency_pair} の決済ボタンが見つかりません: {e}")
-                return False
                 
         except Exception as e:
             self.logger.error(f"一括決済失敗: {e}")
-            await self.take_screenshot("error_close_position")
+            self.take_screenshot("error_close_position")
             raise
             
+    async def close_positions(self, currency_pairs: List[str]) -> Dict[str, bool]:
+        """複数通貨ペアのポジションを決済（各決済は_ui_lockにより1通貨ずつ実行される）"""
+        results = await asyncio.gather(
+            *(self.close_position_by_currency(pair) for pair in currency_pairs),
+            return_exceptions=True
+        )
+        
+        closed = {}
+        for pair, result in zip(currency_pairs, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"{pair} の決済失敗: {result}")
+                result = False
+            closed[pair] = result
+        return closed
+        
     async def close_all_positions(self):
         """全てのポジションを一括決済"""
         try:
             self.logger.info("全ポジションの一括決済を開始")
             
             # 新しい一括決済ボタンを探す
-            bulk_settle_selectors = [
-                'button.button-position-collective-settlement.settle-all.only-position',
-                'button:has-text("全決済")',
-                'button[class*="collective-settlement"]',
-                'button[class*="settle-all"]'
-            ]
-            
-            bulk_settle_button = None
-            for selector in bulk_settle_selectors:
-                try:
-                    bulk_settle_button = await self.page.wait_for_selector(selector, timeout=3000)
-                    if bulk_settle_button:
-                        break
-                except:
-                    continue
+            bulk_settle_button = await self.find_any(self.BULK_SETTLE_SELECTORS, timeout=3000)
             
             if not bulk_settle_button:
                 self.logger.info("一括決済ボタンが見つかりません。ポジションがない可能性があります。")
                 return True
                 
-            # 一括決済ボタンをクリック
-            await bulk_settle_button.click()
-            await self.random_wait(1000)
-            await self.take_screenshot("bulk_settle_clicked")
-            
-            # 新しい確認ボタンを待つ
-            confirm_selectors = [
-                'button[class*="button-large button-confirm"]',
-                'button:has-text("確定")',
-                'button.button-large.button-confirm'
-            ]
-            
-            confirm_button = None
-            for selector in confirm_selectors:
-                try:
-                    confirm_button = await self.page.wait_for_selector(selector, timeout=5000)
-                    if confirm_button:
-                        break
-                except:
-                    continue
-                    
-            if confirm_button:
-                await confirm_button.click()
-                await self.random_wait(2000)
-                await self.take_screenshot("settlement_confirmed")
-                self.logger.info("一括決済を実行しました")
-                return True
-            else:
-                self.logger.warning("確定ボタンが見つかりません")
-                return False
+            # 一括決済ボタンのクリックから確定までは他の決済と重ならないようにする
+            async with self._ui_lock:
+                await bulk_settle_button.click()
+                await self.random_wait(1000)
+                self.take_screenshot("bulk_settle_clicked")
+                
+                # 新しい確認ボタンを待つ
+                confirm_selectors = [
+                    'button[class*="button-large button-confirm"]',
+                    'button:has-text("確定")',
+                    'button.button-large.button-confirm'
+                ]
+                
+                confirm_button = await self.find_any(confirm_selectors, timeout=5000)
+                        
+                if confirm_button:
+                    await confirm_button.click()
+                    await self.random_wait(2000)
+                    self.take_screenshot("settlement_confirmed")
+                    self.logger.info("一括決済を実行しました")
+                    return True
+                else:
+                    self.logger.warning("確定ボタンが見つかりません")
+                    return False
             
         except Exception as e:
             self.logger.error(f"全ポジション決済失敗: {e}")
-            await self.take_screenshot("error_close_all_positions")
+            self.take_screenshot("error_close_all_positions")
             raise
             
     async def close_position(self, currency_pair: str = None):
@@ -763,7 +1184,7 @@ class LineFXBot:
             
         except Exception as e:
             self.logger.error(f"ポジション決済失敗: {e}")
-            await self.take_screenshot("error_close_position_failed")
+            self.take_screenshot("error_close_position_failed")
             raise
             
     async def navigate_to_position_summary(self):
@@ -771,35 +1192,12 @@ class LineFXBot:
         try:
             self.logger.info("建玉サマリ画面に移動中...")
             
-            # テキスト内容で建玉サマリメニューを検索
-            menu_links = await self.page.query_selector_all("a")
-            position_link = None
-            
-            for link in menu_links:
-                try:
-                    text = await link.inner_text()
-                    if "建玉サマリ" in text:
-                        position_link = link
-                        break
-                except:
-                    continue
-                    
-            if not position_link:
-                raise Exception("建玉サマリメニューが見つかりません")
-                
-            await self.random_wait(1000)
-            await position_link.click()
-            await self.take_screenshot("13_position_summary_clicked")
-            
-            # ページが読み込まれるまで待機
-            await self.random_wait(3000)
-            await self.take_screenshot("14_position_summary_page")
-            
+            await self._click_menu("建玉サマリ", "13_position_summary_clicked", "14_position_summary_page")
             return True
             
         except Exception as e:
             self.logger.error(f"建玉サマリ画面への移動失敗: {e}")
-            await self.take_screenshot("error_position_summary_navigation")
+            self.take_screenshot("error_position_summary_navigation")
             raise
             
     async def get_positions(self):
@@ -812,20 +1210,19 @@ class LineFXBot:
             
             # 証拠金状況から評価損益を取得
             try:
-                account_info_elements = await self.page.query_selector_all(".account-info li")
-                positions_info = {}
-                
-                for element in account_info_elements:
-                    try:
-                        text = await element.inner_text()
-                        if "証拠金維持率" in text:
-                            positions_info["margin_ratio"] = text
-                        elif "資産合計" in text:
-                            positions_info["total_assets"] = text
-                        elif "評価損益" in text:
-                            positions_info["unrealized_pnl"] = text
-                    except:
-                        continue
+                # 全項目のテキスト取得と振り分けを1回のevaluateで行う
+                positions_info = await self.page.evaluate(
+                    """(keys) => {
+                        const info = {};
+                        document.querySelectorAll('.account-info li').forEach(li => {
+                            const text = li.innerText;
+                            const hit = keys.find(([needle]) => text.includes(needle));
+                            if (hit) info[hit[1]] = text;
+                        });
+                        return info;
+                    }""",
+                    self.ACCOUNT_INFO_KEYS
+                )
                         
                 self.logger.info(f"ポジション情報: {positions_info}")
                 return positions_info
@@ -860,17 +1257,16 @@ class LineFXBot:
             self.logger.error(f"BOT実行失敗: {e}")
             raise
         finally:
-            if self.browser:
-                await self.browser.close()
-                self.logger.info("ブラウザを終了しました")
+            await self.close_browser()
                 
     def load_trade_data(self):
         """トレードデータを読み込み"""
         try:
             data_source_type = self.settings.get('data_source', {}).get('type', 'excel')
-            self.logger.info(f"トレードデータを読み込み中 (ソース: {data_source_type})")
+            self.logger.info("トレードデータを読み込み中 (ソース: %s)", data_source_type)
             
-            success = self.schedule_manager.load_data()
+            with self._data_lock:
+                success = self.schedule_manager.load_data()
             if success:
                 summary = self.schedule_manager.get_trade_summary()
                 self.logger.info(
@@ -882,50 +1278,89 @@ class LineFXBot:
                 trades = self.schedule_manager.trades_data[:5]
                 for trade in trades:
                     self.logger.info(
-                        f"  - {trade['currency_pair']} {trade['side']} {trade['quantity']} "
-                        f"エントリー: {trade['entry_time']} 決済: {trade['exit_time']}"
+                        f"  - {trade.currency_pair} {trade.side} {trade.quantity} "
+                        f"エントリー: {trade.entry_time} 決済: {trade.exit_time}"
                     )
                 if len(self.schedule_manager.trades_data) > 5:
-                    self.logger.info(f"  ... 他{len(self.schedule_manager.trades_data) - 5}件")
+                    self.logger.info("  ... 他%s件", len(self.schedule_manager.trades_data) - 5)
             else:
                 self.logger.warning("トレードデータが見つかりませんでした")
                 
         except Exception as e:
-            self.logger.error(f"トレードデータ読み込みエラー: {e}")
+            self.logger.error("トレードデータ読み込みエラー: %s", e)
 
-    async def execute_scheduled_trade(self, trade: Dict) -> bool:
+    def queue_trade_mark(self, trade_id: str, status: str):
+        """実行済み(executed)・決済済み(closed)のマークを書き込みキューに積む"""
+        self._mark_queue.put_nowait((trade_id, status))
+        if self._mark_writer_task is None or self._mark_writer_task.done():
+            self._mark_writer_task = asyncio.create_task(self._mark_writer())
+    
+    async def _mark_writer(self):
+        """キューに溜まったマークを一定間隔でまとめてデータソースへ書き込む"""
+        while True:
+            batch = [await self._mark_queue.get()]
+            await asyncio.sleep(self.MARK_FLUSH_INTERVAL)
+            while len(batch) < self.MARK_BATCH_SIZE and not self._mark_queue.empty():
+                batch.append(self._mark_queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write_trade_marks, batch)
+            finally:
+                for _ in batch:
+                    self._mark_queue.task_done()
+    
+    def _write_trade_marks(self, batch: List[tuple]):
+        """マークをデータソースへ書き込む（書き込みスレッドで実行）"""
+        with self._data_lock:
+            for trade_id, status in batch:
+                try:
+                    if status == 'executed':
+                        success = self.schedule_manager.mark_trade_executed(trade_id)
+                    else:
+                        success = self.schedule_manager.mark_trade_closed(trade_id)
+                    if not success:
+                        self.logger.warning("データソースのマーク更新に失敗: %s (%s)", trade_id, status)
+                except Exception as e:
+                    self.logger.warning("データソースのマーク更新エラー %s (%s): %s", trade_id, status, e)
+    
+    async def flush_trade_marks(self):
+        """書き込み待ちのマークをすべて反映し、書き込みタスクを止める"""
+        if self._mark_writer_task is None:
+            return
+        if not self._mark_writer_task.done():
+            await self._mark_queue.join()
+        self._mark_writer_task.cancel()
+        self._mark_writer_task = None
+    
+    async def execute_scheduled_trade(self, trade: Trade) -> bool:
         """スケジュールされたトレードを実行"""
         try:
-            self.logger.info(f"スケジュールトレード実行: {trade['id']} - {trade['currency_pair']} {trade['side']} {trade['quantity']}")
+            self.logger.info(f"スケジュールトレード実行: {trade.id} - {trade.currency_pair} {trade.side} {trade.quantity}")
             
             # LINE FXの形式に変換
-            order_type = trade['side']  # buy/sell
-            currency_pair = trade['currency_pair']  # そのまま使用（USD/JPYなど）
-            amount = trade['quantity']
+            order_type = trade.side  # buy/sell
+            currency_pair = trade.currency_pair  # そのまま使用（USD/JPYなど）
+            amount = trade.quantity
             
             await self.place_order(order_type, amount, currency_pair)
             
-            # 実行完了をマーク（メモリ管理のため、ここではCSV更新エラーを無視）
-            try:
-                self.schedule_manager.mark_trade_executed(trade['id'])
-            except Exception as e:
-                self.logger.warning(f"CSV更新エラー（メモリ管理で代替済み）: {e}")
+            # 実行完了のマークはバックグラウンドで書き込む（実行管理はメモリ上で行う）
+            self.queue_trade_mark(trade.id, 'executed')
             
-            self.logger.info(f"スケジュールトレード実行完了: {trade['id']}")
+            self.logger.info(f"スケジュールトレード実行完了: {trade.id}")
             return True
             
         except Exception as e:
-            self.logger.error(f"スケジュールトレード実行エラー {trade['id']}: {e}")
+            self.logger.error(f"スケジュールトレード実行エラー {trade.id}: {e}")
             return False
 
-    async def prepare_scheduled_trade(self, trade: Dict) -> bool:
+    async def prepare_scheduled_trade(self, trade: Trade) -> bool:
         """スケジュールトレードの事前準備"""
         try:
-            trade_id = trade['id']
-            self.logger.info(f"スケジュールトレード事前準備: {trade_id} - {trade['currency_pair']} {trade['side']} {trade['quantity']}")
+            trade_id = trade.id
+            self.logger.info(f"スケジュールトレード事前準備: {trade_id} - {trade.currency_pair} {trade.side} {trade.quantity}")
             
-            currency_pair = trade['currency_pair']
-            amount = trade['quantity']
+            currency_pair = trade.currency_pair
+            amount = trade.quantity
             
             # 事前準備実行
             await self.prepare_order(currency_pair, amount)
@@ -940,13 +1375,13 @@ class LineFXBot:
             return True
             
         except Exception as e:
-            self.logger.error(f"スケジュールトレード事前準備エラー {trade['id']}: {e}")
+            self.logger.error(f"スケジュールトレード事前準備エラー {trade.id}: {e}")
             return False
 
-    async def execute_prepared_trade(self, trade: Dict) -> bool:
+    async def execute_prepared_trade(self, trade: Trade) -> bool:
         """事前準備済みトレードの高速実行"""
         try:
-            trade_id = trade['id']
+            trade_id = trade.id
             self.logger.info(f"事前準備済みトレード高速実行: {trade_id}")
             
             if trade_id not in self.prepared_trades:
@@ -954,30 +1389,30 @@ class LineFXBot:
                 return False
             
             # 事前準備済みなので、Bid/Askボタンを直接クリック
-            order_type = trade['side'].lower()
+            order_type = trade.side.lower()
             if order_type in ['buy', 'long']:
-                button_selector = 'button.button-order-ask'  # 買い注文はAskボタン
+                order_button = self._ask_button  # 買い注文はAskボタン
+                selector = self.ASK_BUTTON_SELECTOR
                 button_name = "Ask(買い)"
             else:
-                button_selector = 'button.button-order-bid'  # 売り注文はBidボタン
+                order_button = self._bid_button  # 売り注文はBidボタン
+                selector = self.BID_BUTTON_SELECTOR
                 button_name = "Bid(売り)"
             
             self.logger.info(f"高速注文実行: {button_name}ボタンをクリック")
-            order_button = await self.page.query_selector(button_selector)
-            if order_button:
-                await order_button.click()
-                await self.page.wait_for_timeout(1000)
+            if await self._fast_click(order_button, selector):
                 
-                # 注文確認ダイアログがある場合は確定ボタンをクリック
-                confirm_button = await self.page.query_selector('button.button-large.button-confirm')
-                if confirm_button:
-                    await confirm_button.click()
-                    await self.page.wait_for_timeout(500)
+                # 注文確認ダイアログが表示されたら即座に確定（表示されなければ確認不要の注文）
+                try:
+                    await self._order_confirm_button.wait_for(state='visible', timeout=1500)
+                except Exception:
+                    pass
+                else:
+                    await self._order_confirm_button.click()
                     self.logger.info(f"注文確定完了: {trade_id}")
                 
                 # 事前準備データをクリア
-                if trade_id in self.prepared_trades:
-                    del self.prepared_trades[trade_id]
+                self.prepared_trades.pop(trade_id, None)
                 
                 self.logger.info(f"事前準備済みトレード高速実行完了: {trade_id}")
                 return True
@@ -986,33 +1421,32 @@ class LineFXBot:
                 return False
                 
         except Exception as e:
-            self.logger.error(f"事前準備済みトレード実行エラー {trade['id']}: {e}")
+            self.logger.error(f"事前準備済みトレード実行エラー {trade.id}: {e}")
             return False
 
-    async def prepare_closing(self, trade: Dict) -> bool:
+    async def _fast_click(self, locator, selector: str) -> bool:
+        """事前準備で確認済みのボタンをページ内で直接クリック（ボタンが無ければFalse）"""
+        if self._cdp is None:
+            if await locator.count() == 0:
+                return False
+            await locator.click()
+            return True
+        
+        # 存在確認とクリックを1往復で行う
+        result = await self._cdp.send('Runtime.evaluate', {
+            'expression': f"(() => {{ const b = document.querySelector({json.dumps(selector)}); if (!b) return false; b.click(); return true; }})()",
+            'returnByValue': True
+        })
+        return bool(result.get('result', {}).get('value'))
+    
+    async def prepare_closing(self, trade: Trade) -> bool:
         """決済の事前準備"""
         try:
-            trade_id = trade['id']
-            self.logger.info(f"決済事前準備開始: {trade_id} - {trade['currency_pair']}")
-            
-            # 決済事前準備として全決済ボタンの存在確認
-            bulk_settle_selectors = [
-                'button.button-position-collective-settlement.settle-all.only-position',
-                'button:has-text("全決済")',
-                'button[class*="collective-settlement"]',
-                'button[class*="settle-all"]'
-            ]
+            trade_id = trade.id
+            self.logger.info(f"決済事前準備開始: {trade_id} - {trade.currency_pair}")
             
-            bulk_settle_button = None
-            for selector in bulk_settle_selectors:
-                try:
-                    bulk_settle_button = await self.page.wait_for_selector(selector, timeout=2000)
-                    if bulk_settle_button and await bulk_settle_button.is_visible():
-                        break
-                    else:
-                        bulk_settle_button = None
-                except:
-                    continue
+            # 決済事前準備として全決済ボタンの存在確認（全候補を1回の待機で判定）
+            bulk_settle_button = await self.find_any(self.BULK_SETTLE_SELECTORS, timeout=2000)
             
             if bulk_settle_button:
                 # 決済準備済みとしてマーク
@@ -1027,14 +1461,20 @@ class LineFXBot:
                 return False
                 
         except Exception as e:
-            self.logger.error(f"決済事前準備エラー {trade['id']}: {e}")
+            self.logger.error(f"決済事前準備エラー {trade.id}: {e}")
             return False
     
-    async def execute_prepared_closing(self, trade: Dict) -> bool:
+    async def _prepare_closing_bounded(self, trade: Trade) -> bool:
+        """同時実行数を制限して決済の事前準備を行う"""
+        async with self._prep_sem:
+            self.logger.info(f"決済事前準備開始: {trade.id}")
+            return await self.prepare_closing(trade)
+    
+    async def execute_prepared_closing(self, trade: Trade) -> bool:
         """事前準備済み決済を実行"""
         try:
-            trade_id = trade['id']
-            self.logger.info(f"事前準備済み決済実行: {trade_id} - {trade['currency_pair']}")
+            trade_id = trade.id
+            self.logger.info(f"事前準備済み決済実行: {trade_id} - {trade.currency_pair}")
             
             if trade_id not in self.prepared_closings:
                 self.logger.error(f"決済が事前準備されていません: {trade_id}")
@@ -1044,144 +1484,210 @@ class LineFXBot:
             await self.close_all_positions()
             
             # 準備済みリストから削除
-            del self.prepared_closings[trade_id]
+            self.prepared_closings.pop(trade_id, None)
             
             self.logger.info(f"事前準備済み決済実行完了: {trade_id}")
             return True
             
         except Exception as e:
-            self.logger.error(f"事前準備済み決済実行エラー {trade['id']}: {e}")
+            self.logger.error(f"事前準備済み決済実行エラー {trade.id}: {e}")
             return False
 
-    async def close_scheduled_trade(self, trade: Dict) -> bool:
+    async def close_scheduled_trade(self, trade: Trade) -> bool:
         """スケジュールされたトレードを決済"""
         try:
-            self.logger.info(f"スケジュール決済実行: {trade['id']} - {trade['currency_pair']}")
+            self.logger.info(f"スケジュール決済実行: {trade.id} - {trade.currency_pair}")
             
             # 決済処理（新しい一括決済機能を利用）
-            currency_pair = trade['currency_pair']
+            currency_pair = trade.currency_pair
             result = await self.close_position(currency_pair)
             
             if result:
-                # 決済完了をマーク（メモリ管理のため、ここではCSV更新エラーを無視）
-                try:
-                    self.schedule_manager.mark_trade_closed(trade['id'])
-                except Exception as e:
-                    self.logger.warning(f"CSV更新エラー（メモリ管理で代替済み）: {e}")
-                self.logger.info(f"スケジュール決済完了: {trade['id']}")
+                # 決済完了のマークはバックグラウンドで書き込む（実行管理はメモリ上で行う）
+                self.queue_trade_mark(trade.id, 'closed')
+                self.logger.info(f"スケジュール決済完了: {trade.id}")
                 return True
             else:
-                self.logger.warning(f"決済対象ポジションが見つかりません: {trade['id']}")
+                self.logger.warning(f"決済対象ポジションが見つかりません: {trade.id}")
                 return False
             
         except Exception as e:
-            self.logger.error(f"スケジュール決済エラー {trade['id']}: {e}")
+            self.logger.error(f"スケジュール決済エラー {trade.id}: {e}")
             return False
 
+    async def wait_order_ui_settled(self, timeout: int = 3000):
+        """注文・決済の確認ダイアログが閉じるまで待つ（表示されていなければ即座に戻る）"""
+        try:
+            await self._order_confirm_button.wait_for(state='hidden', timeout=timeout)
+        except Exception as e:
+            self.logger.warning(f"確認ダイアログが閉じるのを待機中にタイムアウト: {e}")
+    
+    # スケジュールイベントの種類（同時刻なら数値の小さい順に処理）
+    EVENT_PREPARE_ENTRY, EVENT_ENTRY, EVENT_PREPARE_CLOSE, EVENT_CLOSE = range(4)
+    # エントリー・決済の何秒前に事前準備するか
+    PREPARE_LEAD_SECONDS = 30
+    
+    def _build_event_heap(self) -> List[tuple]:
+        """トレードデータから (発火時刻[epoch秒], 種類, 連番, トレード) のヒープを作成"""
+        # 構築時点で状態を振り分け、このセッションで処理済みのトレードはイベント自体を作らない
+        # 時刻は毎ティックの比較を浮動小数の引き算で済ませるためepoch秒に変換しておく
+        lead = self.PREPARE_LEAD_SECONDS
+        events = []
+        for seq, trade in enumerate(self.schedule_manager.trades_data):
+            trade_id = trade.id
+            entry_time = trade.entry_time
+            exit_time = trade.exit_time
+            if entry_time and not trade.executed and trade_id not in self.executed_trades:
+                entry_ts = _local_epoch(entry_time)
+                events.append((entry_ts - lead, self.EVENT_PREPARE_ENTRY, seq, trade))
+                events.append((entry_ts, self.EVENT_ENTRY, seq, trade))
+            if exit_time and trade_id not in self.closed_trades:
+                exit_ts = _local_epoch(exit_time)
+                events.append((exit_ts - lead, self.EVENT_PREPARE_CLOSE, seq, trade))
+                events.append((exit_ts, self.EVENT_CLOSE, seq, trade))
+        heapq.heapify(events)
+        return events
+    
+    def reload_schedule(self):
+        """トレードデータを再読み込みし、メインループのイベントを作り直す"""
+        self.load_trade_data()
+        self._reload_event.set()
+    
     async def main_trading_loop(self):
-        """メイン取引ループ（スケジュールベース）"""
+        """メイン取引ループ（次のイベント時刻まで待機するスケジュールベース）"""
         check_interval = self.trading_config.get('check_interval', 30)
+        tolerance = self.trading_config.get('time_tolerance_seconds', 15)
+        lead = self.PREPARE_LEAD_SECONDS
+        
+        events = self._build_event_heap()
+        self.logger.info("スケジュールイベント: %s件", len(events))
         
         while self.running:
             try:
-                current_time = datetime.now()
-                self.logger.info(f"--- スケジュールチェック開始: {current_time.strftime('%Y-%m-%d %H:%M:%S')} ---")
+                # 次のイベントまで待機（時計の補正に追従するため最長でもcheck_interval）
+                # 再読み込み・停止の要求があれば即座に起きる
+                delay = check_interval
+                if events:
+                    delay = min(delay, max(0.0, events[0][0] - time.time()))
+                try:
+                    await asyncio.wait_for(self._reload_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
                 
-                if not self.schedule_manager.trades_data:
-                    self.logger.info("トレードデータがありません")
-                    await asyncio.sleep(check_interval)
+                if not self.running:
+                    break
+                if self._reload_event.is_set():
+                    self._reload_event.clear()
+                    events = self._build_event_heap()
+                    self.logger.info("スケジュールを再構築: %s件", len(events))
                     continue
                 
-                # エントリー対象のトレードをチェック
-                tolerance_seconds = self.trading_config.get('time_tolerance_seconds', 15)
+                # 発火時刻を過ぎたイベントをまとめて取り出す
+                now = time.time()
+                due = []
+                while events and events[0][0] <= now:
+                    due.append(heapq.heappop(events))
+                if not due:
+                    continue
                 
-                # エントリー事前準備（30秒前から準備開始）
-                prep_trades = self.schedule_manager.get_trades_for_time(current_time + timedelta(seconds=30), tolerance_seconds)
-                for trade in prep_trades:
-                    trade_id = trade['id']
-                    if trade_id not in self.prepared_trades and trade_id not in self.executed_trades:
-                        self.logger.info(f"エントリー事前準備開始: {trade_id}")
-                        success = await self.prepare_scheduled_trade(trade)
-                        if success:
-                            self.logger.info(f"エントリー事前準備完了: {trade_id}")
-                        else:
-                            self.logger.error(f"エントリー事前準備失敗: {trade_id}")
+                self.logger.info("--- スケジュールイベント処理: %s (%s件) ---", time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)), len(due))
                 
-                # エントリー実行（時刻指定）
-                entry_trades = self.schedule_manager.get_trades_for_time(current_time, tolerance_seconds)
-                for trade in entry_trades:
-                    trade_id = trade['id']
+                closing_targets = []
+                close_targets = []
+                for fire_time, kind, _, trade in due:
+                    trade_id = trade.id
                     
-                    # メモリ内で重複チェック
-                    if trade_id in self.executed_trades:
-                        self.logger.info(f"既に実行済みをスキップ: {trade_id}")
-                        continue
+                    if kind == self.EVENT_PREPARE_ENTRY:
+                        # エントリー時刻を過ぎていれば準備は不要
+                        if now - (fire_time + lead) > tolerance:
+                            continue
+                        if trade_id not in self.prepared_trades and trade_id not in self.executed_trades:
+                            self.logger.info("エントリー事前準備開始: %s", trade_id)
+                            success = await self.prepare_scheduled_trade(trade)
+                            if success:
+                                self.logger.info("エントリー事前準備完了: %s", trade_id)
+                            else:
+                                self.logger.error("エントリー事前準備失敗: %s", trade_id)
                     
-                    # 事前準備済みなら高速実行、未準備なら従来方式
-                    if trade_id in self.prepared_trades:
-                        success = await self.execute_prepared_trade(trade)
-                    else:
-                        success = await self.execute_scheduled_trade(trade)
+                    elif kind == self.EVENT_ENTRY:
+                        if now - fire_time > tolerance:
+                            self.logger.warning("エントリー時刻を過ぎているためスキップ: %s (%s)", trade_id, time.strftime('%H:%M:%S', time.localtime(fire_time)))
+                            continue
                         
-                    if success:
-                        self.executed_trades.add(trade_id)  # メモリに記録
-                        self.logger.info(f"エントリー成功: {trade_id}")
-                    else:
-                        self.logger.error(f"エントリー失敗: {trade_id}")
-                    
-                    await self.random_wait(1000)  # 連続実行の間隔
-                
-                # 決済事前準備（30秒前から準備開始）
-                prep_closings = self.schedule_manager.get_trades_to_close(current_time + timedelta(seconds=30), tolerance_seconds)
-                for trade in prep_closings:
-                    trade_id = trade['id']
-                    # 実行済みかつ未決済かつ未準備の場合のみ準備
-                    if (trade_id in self.executed_trades and 
-                        trade_id not in self.closed_trades and 
-                        trade_id not in self.prepared_closings):
-                        self.logger.info(f"決済事前準備開始: {trade_id}")
-                        success = await self.prepare_closing(trade)
+                        # メモリ内で重複チェック
+                        if trade_id in self.executed_trades:
+                            self.logger.info("既に実行済みをスキップ: %s", trade_id)
+                            continue
+                        
+                        # 事前準備済みなら高速実行、未準備なら従来方式
+                        if trade_id in self.prepared_trades:
+                            success = await self.execute_prepared_trade(trade)
+                        else:
+                            success = await self.execute_scheduled_trade(trade)
+                            
                         if success:
-                            self.logger.info(f"決済事前準備完了: {trade_id}")
+                            self.executed_trades.add(trade_id)  # メモリに記録
+                            self.logger.info("エントリー成功: %s", trade_id)
                         else:
-                            self.logger.error(f"決済事前準備失敗: {trade_id}")
-                
-                # 決済実行（時刻指定）
-                close_trades = self.schedule_manager.get_trades_to_close(current_time, tolerance_seconds)
-                self.logger.info(f"決済対象チェック: {len(close_trades)}件 (現在時刻: {current_time.strftime('%H:%M:%S')})")
-                if len(close_trades) > 0:
-                    for t in close_trades:
-                        self.logger.info(f"決済候補: {t['id']} - {t['currency_pair']} 決済時刻: {t.get('exit_time', 'なし')}")
-                for trade in close_trades:
-                    trade_id = trade['id']
-                    
-                    # メモリ内で重複チェック（実行済みかつ未決済のもの）
-                    executed = trade_id in self.executed_trades
-                    closed = trade_id in self.closed_trades
-                    self.logger.info(f"決済チェック {trade_id}: executed={executed}, closed={closed}")
+                            self.logger.error("エントリー失敗: %s", trade_id)
+                        
+                        await self.wait_order_ui_settled()  # 次の注文の前に画面が落ち着くのを待つ
                     
-                    if not executed or closed:
-                        self.logger.info(f"決済対象外をスキップ: {trade_id} (executed={executed}, closed={closed})")
-                        continue
+                    elif kind == self.EVENT_PREPARE_CLOSE:
+                        if now - (fire_time + lead) > tolerance:
+                            continue
+                        # 実行済みかつ未決済かつ未準備の場合のみ準備
+                        if (trade_id in self.executed_trades and
+                            trade_id not in self.closed_trades and
+                            trade_id not in self.prepared_closings):
+                            closing_targets.append(trade)
                     
-                    # 事前準備済みなら高速実行、未準備なら従来方式
-                    if trade_id in self.prepared_closings:
-                        success = await self.execute_prepared_closing(trade)
-                    else:
-                        success = await self.close_scheduled_trade(trade)
+                    elif kind == self.EVENT_CLOSE:
+                        if now - fire_time > tolerance:
+                            self.logger.warning("決済時刻を過ぎているためスキップ: %s (%s)", trade_id, time.strftime('%H:%M:%S', time.localtime(fire_time)))
+                            continue
+                        
+                        # メモリ内で重複チェック（実行済みかつ未決済のもの）
+                        executed = trade_id in self.executed_trades
+                        closed = trade_id in self.closed_trades
+                        self.logger.info("決済チェック %s: executed=%s, closed=%s", trade_id, executed, closed)
+                        
+                        if not executed or closed:
+                            self.logger.info("決済対象外をスキップ: %s (executed=%s, closed=%s)", trade_id, executed, closed)
+                            continue
+                        close_targets.append(trade)
+                
+                # 決済は実際の建玉を操作するため1件ずつ実行し、間隔を空ける
+                for trade in close_targets:
+                    try:
+                        # 事前準備済みなら高速実行、未準備なら従来方式
+                        if trade.id in self.prepared_closings:
+                            success = await self.execute_prepared_closing(trade)
+                        else:
+                            success = await self.close_scheduled_trade(trade)
+                    except Exception as e:
+                        self.logger.error("決済エラー %s: %s", trade.id, e)
+                        success = False
                     if success:
-                        self.closed_trades.add(trade_id)  # メモリに記録
-                        self.logger.info(f"決済成功: {trade_id}")
+                        self.closed_trades.add(trade.id)  # メモリに記録
+                        self.logger.info("決済成功: %s", trade.id)
                     else:
-                        self.logger.error(f"決済失敗: {trade_id}")
+                        self.logger.error("決済失敗: %s", trade.id)
                     
                     await self.random_wait(2000)
                 
-                self.logger.info("--- スケジュールチェック完了 ---")
-                await asyncio.sleep(check_interval)
+                # 決済準備はボタンの存在確認のみで画面を変更しないため並行実行する
+                results = await asyncio.gather(*(self._prepare_closing_bounded(trade) for trade in closing_targets))
+                for trade, success in zip(closing_targets, results):
+                    if success:
+                        self.logger.info("決済事前準備完了: %s", trade.id)
+                    else:
+                        self.logger.error("決済事前準備失敗: %s", trade.id)
+                
+                self.logger.info("--- スケジュールイベント処理完了 ---")
                 
             except Exception as e:
-                self.logger.error(f"メインループエラー: {e}")
+                self.logger.error("メインループエラー: %s", e)
                 await asyncio.sleep(60)  # エラー時は1分待機
 
     async def start_scheduled_trading(self):
@@ -1215,6 +1721,7 @@ class LineFXBot:
     async def stop_scheduled_trading(self):
         """スケジュールベースの自動取引を停止"""
         self.running = False
+        self._reload_event.set()  # 待機中のメインループを起こして終了させる
         self.logger.info("スケジュールベース取引停止")
 
     async def run_trading_session(self, orders: list = None):
@@ -1245,59 +1752,42 @@ class LineFXBot:
             self.logger.error(f"取引セッション失敗: {e}")
             raise
         finally:
-            if self.browser:
-                await self.browser.close()
-                self.logger.info("ブラウザを終了しました")
+            await self.close_browser()
                 
     async def test_element_detection(self):
         """要素検出テスト（環境調査用）"""
         try:
             self.logger.info("=== 要素検出テスト開始 ===")
             
-            # 通貨プルダウンアイコン
-            try:
-                dropdown = await self.page.query_selector('i.svg-icons.icon-dropdown')
-                self.logger.info(f"✓ 通貨プルダウンアイコン: {'Found' if dropdown else 'Not Found'}")
-            except Exception as e:
-                self.logger.warning(f"✗ 通貨プルダウンアイコン: {e}")
-                
-            # 数量ボタン
+            # 全要素の検出を1回のevaluateでまとめて行う
             try:
-                qty_buttons = await self.page.query_selector_all('li[btnradio].label')
-                self.logger.info(f"✓ 数量ボタン: {len(qty_buttons)}個検出")
-            except Exception as e:
-                self.logger.warning(f"✗ 数量ボタン: {e}")
-                
-            # 数量プラスボタン
-            try:
-                plus_btn = await self.page.query_selector('i.svg-icons.icon-qty-add')
-                self.logger.info(f"✓ 数量プラスボタン: {'Found' if plus_btn else 'Not Found'}")
-            except Exception as e:
-                self.logger.warning(f"✗ 数量プラスボタン: {e}")
-                
-            # Bid/Askボタン
-            try:
-                bid_btn = await self.page.query_selector('button.button-order-bid')
-                ask_btn = await self.page.query_selector('button.button-order-ask')
-                self.logger.info(f"✓ Bidボタン: {'Found' if bid_btn else 'Not Found'}")
-                self.logger.info(f"✓ Askボタン: {'Found' if ask_btn else 'Not Found'}")
-            except Exception as e:
-                self.logger.warning(f"✗ Bid/Askボタン: {e}")
-                
-            # 決済ボタン
-            try:
-                settle_buttons = await self.page.query_selector_all('button.button-order-settle')
-                self.logger.info(f"✓ 決済ボタン: {len(settle_buttons)}個検出")
-                for i, btn in enumerate(settle_buttons[:3]):  # 最初の3個だけ表示
-                    try:
-                        text = await btn.inner_text()
-                        self.logger.info(f"  - 決済ボタン{i+1}: {text.strip()}")
-                    except:
-                        pass
+                report = await self.page.evaluate(
+                    """() => {
+                        const settleButtons = [...document.querySelectorAll('button.button-order-settle')];
+                        return {
+                            dropdown: !!document.querySelector('i.svg-icons.icon-dropdown'),
+                            qty_buttons: document.querySelectorAll('li[btnradio].label').length,
+                            plus: !!document.querySelector('i.svg-icons.icon-qty-add'),
+                            bid: !!document.querySelector('button.button-order-bid'),
+                            ask: !!document.querySelector('button.button-order-ask'),
+                            settle_count: settleButtons.length,
+                            settle_texts: settleButtons.slice(0, 3).map(button => button.innerText.trim())
+                        };
+                    }"""
+                )
+                found = lambda value: 'Found' if value else 'Not Found'
+                self.logger.info(f"✓ 通貨プルダウンアイコン: {found(report['dropdown'])}")
+                self.logger.info(f"✓ 数量ボタン: {report['qty_buttons']}個検出")
+                self.logger.info(f"✓ 数量プラスボタン: {found(report['plus'])}")
+                self.logger.info(f"✓ Bidボタン: {found(report['bid'])}")
+                self.logger.info(f"✓ Askボタン: {found(report['ask'])}")
+                self.logger.info(f"✓ 決済ボタン: {report['settle_count']}個検出")
+                for i, text in enumerate(report['settle_texts']):  # 最初の3個だけ表示
+                    self.logger.info(f"  - 決済ボタン{i+1}: {text}")
             except Exception as e:
-                self.logger.warning(f"✗ 決済ボタン: {e}")
+                self.logger.warning(f"✗ 要素検出: {e}")
                 
-            await self.take_screenshot("element_detection_test")
+            self.take_screenshot("element_detection_test")
             self.logger.info("=== 要素検出テスト完了 ===")
             
         except Exception as e:
@@ -1368,14 +1858,16 @@ class LineFXBot:
             self.logger.error(f"環境調査エラー: {e}")
             raise
         finally:
-            if self.browser:
-                await self.browser.close()
-                self.logger.info("ブラウザを終了しました")
+            await self.close_browser()
                 
     async def cleanup(self):
         """クリーンアップ処理"""
+        await self.flush_screenshots()
         if hasattr(self, 'running'):
             await self.stop_scheduled_trading()
+        if self.schedule_manager:
+            await self.flush_trade_marks()
+            self.schedule_manager.close()
 
 
 async def main():
@@ -1421,6 +1913,7 @@ async def main():
         print(f"エラーが発生しました: {e}")
     finally:
         await bot.cleanup()
+        await LineFXBot.shutdown_shared_browser()
         print("Bot停止完了")
 
 
@@ -0,0 +1,16 @@
+// 自動化検出を回避するための初期化スクリプト（init_browserで全ページに注入）
+Object.defineProperty(navigator, 'webdriver', {
+    get: () => undefined,
+});
+
+window.chrome = {
+    runtime: {},
+};
+
+Object.defineProperty(navigator, 'plugins', {
+    get: () => [1, 2, 3, 4, 5],
+});
+
+Object.defineProperty(navigator, 'languages', {
+    get: () => ['ja-JP', 'ja'],
+});
@@ -3,96 +3,232 @@ LINE FX取引ユーティリティ
 取引に関する便利な関数を提供
 """
 
+import copy
+import functools
+import itertools
 import json
+import logging
+import os
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dump_line = lambda obj: orjson.dumps(
+        obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    _json_loads = json.loads
+    _json_dump_line = lambda obj: json.dumps(obj, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+# analyze_html_structureで数えるタグ名と検索バイト列（UTF-8のままデコードせずに数える）
+_TAG_NEEDLES = tuple((tag, f'<{tag}'.encode()) for tag in ('button', 'input', 'form', 'div', 'span', 'a'))
+
+# 潜在的な取引要素のキーワードと、照合用に小文字化したUTF-8バイト列
+_TRADING_KEYWORDS = tuple((keyword, keyword.lower().encode()) for keyword in (
+    'buy', 'sell', 'trade', 'order', 'position',
+    '買い', '売り', '注文', '取引', 'ポジション',
+    'amount', 'price', 'lot', '金額', '価格', '数量'
+))
+
+# validate_orderで受け付ける注文タイプと必須フィールド
+_VALID_ORDER_TYPES = frozenset({'buy', 'sell', 'long', 'short', '買い', '売り'})
+_REQUIRED_ORDER_FIELDS = ('type', 'amount')
+_REQUIRED_ORDER_FIELD_SET = frozenset(_REQUIRED_ORDER_FIELDS)
+
+# HTMLファイルのパス -> ((更新時刻, サイズ), 解析結果)。古いものから破棄する
+_ANALYSIS_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_ANALYSIS_CACHE_MAX = 64
+
+
+@functools.lru_cache(maxsize=512)
+def _load_session_file(path: str, mtime_ns: int, size: int) -> Dict:
+    """取引セッションファイルを解析（パス・更新時刻・サイズをキーにキャッシュ）"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
+
+def _try_load_session_file(args: tuple) -> Optional[Dict]:
+    """_load_session_fileのスレッドプール用ラッパー（読めないファイルはNone）"""
+    try:
+        return _load_session_file(*args)
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=4)
+def _load_session_log(path: str, mtime_ns: int, size: int) -> List[Dict]:
+    """JSONLの取引セッションログを解析（壊れた行は読み飛ばす。パス・更新時刻・サイズをキーにキャッシュ）"""
+    sessions = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                sessions.append(_json_loads(line))
+            except ValueError:
+                continue
+    return sessions
+
 
 class TradingAnalyzer:
     """取引データ分析クラス"""
     
+    # 取引セッションを1行1件で追記するログファイル名
+    SESSION_LOG_NAME = "trading_sessions.jsonl"
+    # 以前の形式のセッションファイルを並列に読み込むスレッド数
+    LEGACY_LOAD_WORKERS = 8
+    
     def __init__(self, base_path: Path):
         self.base_path = base_path
         self.data_dir = base_path / "data"
         self.data_dir.mkdir(exist_ok=True)
         
     def save_trading_session(self, session_data: Dict):
-        """取引セッションデータを保存"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"trading_session_{timestamp}.json"
-        filepath = self.data_dir / filename
+        """取引セッションデータをログファイルに1行として追記"""
+        filepath = self.data_dir / self.SESSION_LOG_NAME
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=2)
+        with open(filepath, 'ab') as f:
+            f.write(_json_dump_line(session_data))
             
         return filepath
         
     def load_trading_history(self) -> List[Dict]:
-        """取引履歴を読み込み"""
+        """取引履歴を読み込み（変更のないファイルは前回の解析結果の複製を返す）"""
         history = []
-        for json_file in self.data_dir.glob("trading_session_*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    history.append(data)
-            except Exception:
-                continue
+        log_path = self.data_dir / self.SESSION_LOG_NAME
+        try:
+            stat = log_path.stat()
+            history.extend(_load_session_log(str(log_path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            pass
+        
+        # 以前の形式（セッションごとのJSONファイル）も読み込む
+        # globのパターン照合の代わりに前方・後方一致で絞り込み、readdirで得たstat情報を使う
+        legacy_files = []
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                if not (entry.name.startswith("trading_session_") and entry.name.endswith(".json")):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                legacy_files.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        
+        # ファイルが複数あれば読み込みと解析をスレッドプールで並列に行う
+        if len(legacy_files) > 1:
+            workers = min(self.LEGACY_LOAD_WORKERS, len(legacy_files))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                loaded = list(executor.map(_try_load_session_file, legacy_files))
+        else:
+            loaded = [_try_load_session_file(args) for args in legacy_files]
+        history.extend(session for session in loaded if session is not None)
                 
-        return sorted(history, key=lambda x: x.get('timestamp', ''))
+        # キャッシュ済みの解析結果は共有されるため、呼び出し側には複製を渡す
+        return [copy.deepcopy(session) for session in sorted(history, key=lambda x: x.get('timestamp', ''))]
         
     def analyze_html_structure(self, html_file: Path) -> Dict:
-        """HTML構造を解析"""
-        if not html_file.exists():
-            return {}
-            
+        """HTML構造を解析（同じファイルが変更されていなければ前回の結果の複製を返す）"""
         try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            # exists()で確認してから開くのではなく、stat自体の失敗で存在しないことを判定する
+            try:
+                stat = html_file.stat()
+            except FileNotFoundError:
+                return {}
+            cache_key = str(html_file)
+            version = (stat.st_mtime_ns, stat.st_size)
+            cached = _ANALYSIS_CACHE.get(cache_key)
+            if cached is not None and cached[0] == version:
+                _ANALYSIS_CACHE.move_to_end(cache_key)
+                return copy.deepcopy(cached[1])
+            
+            try:
+                html_bytes = html_file.read_bytes()
+            except FileNotFoundError:
+                return {}
                 
             analysis = {
-                'file_size': len(html_content),
+                'file_size': len(html_bytes),
                 'element_counts': {},
                 'potential_selectors': [],
                 'forms': [],
                 'buttons': []
             }
             
+            # 小文字化は1回だけ行い、要素カウントとキーワード検索で共有する
+            # （bytes.lowerはASCIIのみ変換するが、タグ名と英字キーワードはASCII、日本語キーワードは大小の区別がない）
+            html_lower = html_bytes.lower()
+            
             # 簡単な要素カウント
-            for tag in ['button', 'input', 'form', 'div', 'span', 'a']:
-                count = html_content.lower().count(f'<{tag}')
-                analysis['element_counts'][tag] = count
+            for tag, needle in _TAG_NEEDLES:
+                analysis['element_counts'][tag] = html_lower.count(needle)
                 
             # 潜在的な取引要素を検索
-            trading_keywords = [
-                'buy', 'sell', 'trade', 'order', 'position',
-                '買い', '売り', '注文', '取引', 'ポジション',
-                'amount', 'price', 'lot', '金額', '価格', '数量'
-            ]
-            
-            for keyword in trading_keywords:
-                if keyword.lower() in html_content.lower():
+            for keyword, keyword_lower in _TRADING_KEYWORDS:
+                if keyword_lower in html_lower:
                     analysis['potential_selectors'].append(keyword)
-                    
-            return analysis
+            
+            _ANALYSIS_CACHE[cache_key] = (version, analysis)
+            _ANALYSIS_CACHE.move_to_end(cache_key)
+            if len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_MAX:
+                _ANALYSIS_CACHE.popitem(last=False)
+            # キャッシュの内容を呼び出し側の変更から守るため、返すのは複製にする
+            return copy.deepcopy(analysis)
             
         except Exception as e:
             return {'error': str(e)}
 
 
 class OrderManager:
-    """注文管理クラス"""
+    """注文管理クラス
+    
+    メモリ上の実行済み注文はMAX_EXECUTED_ORDERS件までで、それより古いものはarchive_path（指定時のみ）に移す。
+    このため全注文の一覧は持たず、メモリ上に残っている注文はretained_ordersで参照する。
+    """
+    
+    # 注文IDの連番（インスタンス間で共有し、IDが重複しないようにする）
+    _id_counter = itertools.count()
     
-    def __init__(self):
-        self.orders = []
-        self.executed_orders = []
+    # メモリ上に保持する実行済み注文の上限（超えた分は古いものからアーカイブへ移す）
+    MAX_EXECUTED_ORDERS = 10_000
+    # アーカイブへはこの件数ずつまとめて書き込む
+    ARCHIVE_BATCH_SIZE = 100
+    
+    def __init__(self, archive_path: Optional[Path] = None):
+        # 上限を超えて押し出された実行済み注文はarchive_path（JSONL）に追記してメモリから外す
+        # （archive_path未指定なら押し出された注文は保存しない。サマリーの件数には残る）
+        self.executed_orders = deque(maxlen=self.MAX_EXECUTED_ORDERS)
+        self.archive_path = archive_path
+        self._archive_buffer: List[Dict] = []
+        self.logger = logging.getLogger(__name__)
+        # IDの時刻部分は生成時に1回だけ取得する
+        self._id_prefix = f"order_{int(time.time())}_"
+        # 注文ID -> 注文（追加順）。未実行の注文とメモリ上の実行済み注文だけを保持する
+        self._by_id: Dict[str, Dict] = {}
+        # 未実行の注文（注文ID -> 注文、追加順）。実行時に取り除く
+        self._pending: Dict[str, Dict] = {}
+        # サマリー用の件数は追加時に更新し、一覧を走査しない
+        self._total_count = 0
+        self._buy_count = 0
+        self._executed_count = 0
+        self._sell_count = 0
+        
+    @property
+    def retained_orders(self) -> List[Dict]:
+        """メモリ上に保持している注文（追加順。押し出された実行済み注文は含まない）"""
+        return list(self._by_id.values())
         
     def add_order(self, order_type: str, amount: float, currency_pair: str = "USD/JPY", 
                   stop_loss: float = None, take_profit: float = None) -> Dict:
         """注文を追加"""
         order = {
-            'id': f"order_{int(time.time())}_{len(self.orders)}",
+            'id': f"{self._id_prefix}{next(self._id_counter):x}",
             'type': order_type.lower(),
             'amount': amount,
             'currency_pair': currency_pair,
@@ -102,31 +238,64 @@ class OrderManager:
             'status': 'pending'
         }
         
-        self.orders.append(order)
+        self._by_id[order['id']] = order
+        self._pending[order['id']] = order
+        self._total_count += 1
+        if order['type'] == 'buy':
+            self._buy_count += 1
+        elif order['type'] == 'sell':
+            self._sell_count += 1
         return order
         
     def get_pending_orders(self) -> List[Dict]:
         """未実行の注文を取得"""
-        return [order for order in self.orders if order['status'] == 'pending']
+        return list(self._pending.values())
         
     def mark_order_executed(self, order_id: str, execution_data: Dict):
         """注文を実行済みにマーク"""
-        for order in self.orders:
-            if order['id'] == order_id:
-                order['status'] = 'executed'
-                order['executed_at'] = datetime.now().isoformat()
-                order['execution_data'] = execution_data
-                self.executed_orders.append(order)
-                break
+        order = self._by_id.get(order_id)
+        if order is None:
+            return
+        already_executed = order['status'] == 'executed'
+        self._pending.pop(order_id, None)
+        order['status'] = 'executed'
+        order['executed_at'] = datetime.now().isoformat()
+        order['execution_data'] = execution_data
+        if already_executed:
+            # 再マークは実行情報の更新のみ（実行済み一覧には二重に入れない）
+            return
+        if len(self.executed_orders) == self.executed_orders.maxlen:
+            evicted = self.executed_orders[0]
+            self._by_id.pop(evicted['id'], None)
+            if self.archive_path is not None:
+                self._archive_buffer.append(evicted)
+                if len(self._archive_buffer) >= self.ARCHIVE_BATCH_SIZE:
+                    self.flush_archive()
+        self.executed_orders.append(order)
+        self._executed_count += 1
+        
+    def flush_archive(self) -> bool:
+        """押し出された実行済み注文をまとめてアーカイブに追記（終了時にも呼ぶこと。失敗しても取引は止めない）"""
+        if not self._archive_buffer or self.archive_path is None:
+            return True
+        orders, self._archive_buffer = self._archive_buffer, []
+        try:
+            self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.archive_path, 'ab') as f:
+                f.write(b''.join(_json_dump_line(order) for order in orders))
+            return True
+        except Exception as e:
+            self.logger.warning(f"実行済み注文のアーカイブに失敗 ({len(orders)}件): {e}")
+            return False
                 
     def get_order_summary(self) -> Dict:
         """注文サマリーを取得"""
         return {
-            'total_orders': len(self.orders),
-            'pending_orders': len(self.get_pending_orders()),
-            'executed_orders': len(self.executed_orders),
-            'buy_orders': len([o for o in self.orders if o['type'] == 'buy']),
-            'sell_orders': len([o for o in self.orders if o['type'] == 'sell'])
+            'total_orders': self._total_count,
+            'pending_orders': len(self._pending),
+            'executed_orders': self._executed_count,
+            'buy_orders': self._buy_count,
+            'sell_orders': self._sell_count
         }
 
 
@@ -188,13 +357,12 @@ def create_sample_orders() -> List[Dict]:
 
 def validate_order(order: Dict) -> tuple[bool, str]:
     """注文データを検証"""
-    required_fields = ['type', 'amount']
-    
-    for field in required_fields:
-        if field not in order:
-            return False, f"必須フィールド '{field}' が不足しています"
+    if not _REQUIRED_ORDER_FIELD_SET <= order.keys():
+        # 不足しているフィールド名はエラー時にだけ調べる
+        field = next(f for f in _REQUIRED_ORDER_FIELDS if f not in order)
+        return False, f"必須フィールド '{field}' が不足しています"
             
-    if order['type'].lower() not in ['buy', 'sell', 'long', 'short', '買い', '売り']:
+    if order['type'].lower() not in _VALID_ORDER_TYPES:
         return False, f"無効な注文タイプ: {order['type']}"
         
     if not isinstance(order['amount'], (int, float)) or order['amount'] <= 0:
@@ -4,19 +4,41 @@ import os
 from playwright.async_api import async_playwright
 
 class TestBot:
+    # Playwrightとブラウザはテスト間で共有し、テストごとにはコンテキストだけを作り直す
+    _playwright = None
+    _browser = None
+
     def __init__(self):
         self.page = None
         self.browser = None
+        self.context = None
+        # LINEFX_DEBUG=1 のときだけ利用可能な通貨ペア一覧を取得して表示する
+        self._debug = os.getenv('LINEFX_DEBUG') == '1'
 
     async def setup_browser(self):
-        p = await async_playwright().start()
-        self.browser = await p.chromium.launch(headless=False, args=['--disable-blink-features=AutomationControlled'])
-        context = await self.browser.new_context()
-        self.page = await context.new_page()
+        cls = type(self)
+        if cls._playwright is None:
+            cls._playwright = await async_playwright().start()
+        if cls._browser is None or not cls._browser.is_connected():
+            cls._browser = await cls._playwright.chromium.launch(headless=False, args=['--disable-blink-features=AutomationControlled'])
+        self.browser = cls._browser
+        self.context = await self.browser.new_context()
+        self.page = await self.context.new_page()
         await self.page.set_viewport_size({'width': 1920, 'height': 1080})
         await self.page.goto('https://trade.line-sec.co.jp/')
         print('[INFO] ブラウザ起動完了')
 
+    async def first_present(self, selectors):
+        """全セレクターの件数を同時に調べ、リスト順で最初に存在するものを返す"""
+        locators = [self.page.locator(selector) for selector in selectors]
+        counts = await asyncio.gather(*(locator.count() for locator in locators), return_exceptions=True)
+        for selector, locator, count in zip(selectors, locators, counts):
+            if isinstance(count, Exception):
+                print(f'[DEBUG] セレクタ {selector} 失敗: {count}')
+            elif count > 0:
+                return locator.first, selector
+        return None, None
+
     async def select_currency_pair(self, currency_pair):
         print(f'[INFO] 通貨ペア選択開始: {currency_pair}')
         
@@ -27,18 +49,14 @@ class TestBot:
         ]
         
         selected_selector = None
-        for selector in dropdown_selectors:
+        dropdown, selector = await self.first_present(dropdown_selectors)
+        if dropdown:
+            print(f'[INFO] ドロップダウンボタン見つかりました: {selector}')
             try:
-                dropdown = self.page.locator(selector)
-                if await dropdown.count() > 0:
-                    print(f'[INFO] ドロップダウンボタン見つかりました: {selector}')
-                    await dropdown.click()
-                    selected_selector = selector
-                    await asyncio.sleep(1)
-                    break
+                await dropdown.click()
+                selected_selector = selector
             except Exception as e:
                 print(f'[DEBUG] セレクタ {selector} 失敗: {e}')
-                continue
                 
         if not selected_selector:
             print('[ERROR] ドロップダウンボタンが見つかりません')
@@ -52,38 +70,63 @@ class TestBot:
             f'tr td:has-text("{currency_pair}")',
         ]
         
-        await asyncio.sleep(1)
+        # 固定の待機ではなく、通貨リストが表示された時点で次へ進む
         try:
-            available_pairs = await self.page.locator('td.table-cell-left.text-jp').all_text_contents()
-            print(f'[INFO] 利用可能な通貨ペア: {available_pairs}')
+            await self.page.wait_for_selector('td.table-cell-left.text-jp', state='visible', timeout=3000)
         except Exception as e:
-            print(f'[DEBUG] 通貨ペア取得エラー: {e}')
+            print(f'[DEBUG] 通貨リスト表示待ちタイムアウト: {e}')
+        if self._debug:
+            try:
+                available_pairs = await self.page.locator('td.table-cell-left.text-jp').all_text_contents()
+                print(f'[INFO] 利用可能な通貨ペア: {available_pairs}')
+            except Exception as e:
+                print(f'[DEBUG] 通貨ペア取得エラー: {e}')
         
-        for selector in currency_selectors:
+        # 全候補の件数を同時に調べ、リスト順で最初に一致したセレクターを使う
+        # （or_で結合するとDOM順で最初の要素になり、汎用の候補が優先されてしまう）
+        pair_element, selector = await self.first_present(currency_selectors)
+        if pair_element:
             try:
-                pair_element = self.page.locator(selector)
-                if await pair_element.count() > 0:
-                    print(f'[INFO] 通貨ペア選択: {selector}')
-                    await pair_element.click()
-                    await asyncio.sleep(1)
-                    print(f'[INFO] 通貨ペア {currency_pair} 選択完了')
-                    return True
+                print(f'[INFO] 通貨ペア選択: {selector}')
+                await pair_element.click()
+                # 選択するとリストが閉じるので、それを完了の合図にする
+                try:
+                    await self.page.locator('td.table-cell-left.text-jp').first.wait_for(state='hidden', timeout=3000)
+                except Exception as e:
+                    print(f'[DEBUG] 通貨リストが閉じませんでした: {e}')
+                print(f'[INFO] 通貨ペア {currency_pair} 選択完了')
+                return True
             except Exception as e:
-                print(f'[DEBUG] 通貨ペアセレクタ {selector} 失敗: {e}')
-                continue
+                print(f'[DEBUG] 通貨ペアのクリック失敗: {e}')
         
         print(f'[ERROR] 通貨ペア {currency_pair} が見つかりません')
         return False
 
     async def close_browser(self):
-        if self.browser:
-            await self.browser.close()
+        # 共有ブラウザは残し、このテストのコンテキストだけを閉じる
+        if self.context:
+            await self.context.close()
+            self.context = None
+
+    @classmethod
+    async def shutdown(cls):
+        """共有ブラウザとPlaywrightを終了（全テストの最後に呼ぶ）"""
+        if cls._browser is not None:
+            await cls._browser.close()
+            cls._browser = None
+        if cls._playwright is not None:
+            await cls._playwright.stop()
+            cls._playwright = None
 
 async def test_currency_selection():
     bot = TestBot()
     try:
         await bot.setup_browser()
-        await asyncio.sleep(3)  # 3秒待機
+        # 3秒固定で待たず、通信が落ち着いた時点で開始する（最大3秒）
+        try:
+            await bot.page.wait_for_load_state('networkidle', timeout=3000)
+        except Exception:
+            pass
         result = await bot.select_currency_pair('EUR/JPY')
         print(f'[RESULT] EUR/JPY選択結果: {result}')
     except Exception as e:
@@ -91,5 +134,11 @@ async def test_currency_selection():
     finally:
         await bot.close_browser()
 
+async def main():
+    try:
+        await test_currency_selection()
+    finally:
+        await TestBot.shutdown()
+
 if __name__ == '__main__':
-    asyncio.run(test_currency_selection())
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file